@@ -1,60 +1,54 @@
 from config import constants
-import argparse
 from pathlib import Path
 
-CLI_ARGUMENTS_DEFINITIONS = [
+# Каждая запись: (целевой парсер, флаги, kwargs для add_argument).
+CLI_ARGUMENTS_DEFINITIONS = (
     # Global arguments
-    {
-        "target_parser": "main",
-        "args": [f'--{constants.PROMPT_CONFIG_PATH_KEY.replace("_", "-")}'],
-        "kwargs": {
+    (
+        "main",
+        (f'--{constants.PROMPT_CONFIG_PATH_KEY.replace("_", "-")}',),
+        {
             "type": Path,
             "dest": constants.PROMPT_CONFIG_PATH_KEY,
             "help": f"Путь к YAML-файлу с промптами (по умолчанию: {constants.DEFAULT_PROMPT_CONFIG_PATH}, относительно корня приложения)."
-        }
-    },
-    {
-        "target_parser": "main",
-        "args": [f'--{constants.LOG_FILE_KEY.replace("_", "-")}'],
-        "kwargs": {
+        },
+    ),
+    (
+        "main",
+        (f'--{constants.LOG_FILE_KEY.replace("_", "-")}',),
+        {
             "type": Path,
             "dest": constants.LOG_FILE_KEY,
             "help": f"Путь к файлу логов (по умолчанию: {constants.DEFAULT_LOG_FILE_NAME} в текущей рабочей директории)."
-        }
-    },
+        },
+    ),
     # CLI mode arguments
-    {
-        "target_parser": constants.CLI_MODE,
-        "args": [f'--{constants.PROJECT_PATH_KEY.replace("_", "-")}'],
-        "kwargs": {
+    (
+        constants.CLI_MODE,
+        (f'--{constants.PROJECT_PATH_KEY.replace("_", "-")}',),
+        {
             "type": Path,
             "required": True,
             "dest": constants.PROJECT_PATH_KEY,
             "help": "Путь к директории анализируемого проекта."
-        }
-    },
-    {
-        "target_parser": constants.CLI_MODE,
-        "args": [f'--{constants.CYCLES_KEY.replace("_", "-")}'],
-        "kwargs": {
+        },
+    ),
+    (
+        constants.CLI_MODE,
+        (f'--{constants.CYCLES_KEY.replace("_", "-")}',),
+        {
             "type": int,
             "default": constants.DEFAULT_CYCLES,
             "dest": constants.CYCLES_KEY,
             "help": f"Количество полных циклов улучшения (по умолчанию: {constants.DEFAULT_CYCLES})."
-        }
-    },
+        },
+    ),
     # GUI mode arguments (none specific yet)
-]
+)
 
-SUBPARSER_DEFINITIONS = [
-    {
-        "name": constants.CLI_MODE,
-        "help": "Запустить EvoCode в режиме командной строки.",
-        "formatter_class": argparse.RawTextHelpFormatter
-    },
-    {
-        "name": constants.GUI_MODE,
-        "help": "Запустить EvoCode в графическом интерфейсе.",
-        "formatter_class": None
-    }
-]
+# Каждая запись: (имя подкоманды, справка, имя formatter_class из argparse или None).
+# argparse импортируется только при построении парсера.
+SUBPARSER_DEFINITIONS = (
+    (constants.CLI_MODE, "Запустить EvoCode в режиме командной строки.", "RawTextHelpFormatter"),
+    (constants.GUI_MODE, "Запустить EvoCode в графическом интерфейсе.", None),
+)
@@ -1,19 +1,24 @@
+import sys
+
+# Keys are interned explicitly so that dict lookups across modules
+# can short-circuit on pointer identity.
+
 # Configuration keys
-PROMPT_CONFIG_PATH_KEY = "prompt_config_path"
-API_KEY_ENV_VAR_NAME_KEY = "api_key_env_var_name"
-LOG_FILE_KEY = "log_file"
-MODE_KEY = "mode"
-PROJECT_PATH_KEY = "project_path"
-CYCLES_KEY = "cycles"
-API_KEY_KEY = "api_key"
+PROMPT_CONFIG_PATH_KEY = sys.intern("prompt_config_path")
+API_KEY_ENV_VAR_NAME_KEY = sys.intern("api_key_env_var_name")
+LOG_FILE_KEY = sys.intern("log_file")
+MODE_KEY = sys.intern("mode")
+PROJECT_PATH_KEY = sys.intern("project_path")
+CYCLES_KEY = sys.intern("cycles")
+API_KEY_KEY = sys.intern("api_key")
 
 # Mode names
-CLI_MODE = "cli"
-GUI_MODE = "gui"
+CLI_MODE = sys.intern("cli")
+GUI_MODE = sys.intern("gui")
 
 # Prompt file keys
-SYSTEM_PROMPT_KEY = "system_prompt"
-USER_PROMPT_TEMPLATE_KEY = "user_prompt_template"
+SYSTEM_PROMPT_KEY = sys.intern("system_prompt")
+USER_PROMPT_TEMPLATE_KEY = sys.intern("user_prompt_template")
 
 # Default values
 DEFAULT_PROMPT_CONFIG_PATH = "config/prompts.yaml"
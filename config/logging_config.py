@@ -1,49 +1,76 @@
-import logging.config
 import logging
-from logging.handlers import RotatingFileHandler
+import atexit
+import queue
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
-import copy
-
-LOGGING_CONFIG = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'standard': {
-            'fmt': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        },
-    },
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'level': 'INFO',
-            'formatter': 'standard',
-        },
-        'file': {
-            'class': 'logging.handlers.RotatingFileHandler',
-            'level': 'DEBUG',
-            'formatter': 'standard',
-            'filename': '',  # This will be set dynamically
-            'maxBytes': 10485760,  # 10 MB
-            'backupCount': 5,
-        },
-    },
-    'root': {
-        'handlers': ['console', 'file'],
-        'level': 'DEBUG',
-    },
-}
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+ROOT_LOG_LEVEL = logging.DEBUG
+CONSOLE_LOG_LEVEL = logging.INFO
+FILE_LOG_LEVEL = logging.DEBUG
+LOG_FILE_MAX_BYTES = 10485760  # 10 MB
+LOG_FILE_BACKUP_COUNT = 5
+
+_queue_listener: Optional[QueueListener] = None
+
+
+def _stop_queue_listener():
+    """Останавливает фоновый QueueListener, дописывая оставшиеся записи в файл."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(_stop_queue_listener)
+
+
+def _remove_root_handlers(root: logging.Logger):
+    """Снимает и закрывает обработчики корневого логгера, оставшиеся от предыдущей настройки."""
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
 
 
 def setup_logging(log_file_path: Path):
     """
     Настраивает централизованное логирование для приложения.
 
+    Запись в файл выполняется в фоновом потоке: корневой логгер получает
+    QueueHandler, а RotatingFileHandler обслуживается QueueListener'ом.
+
     Args:
         log_file_path (Path): Путь к файлу логов.
     """
+    global _queue_listener
     # Ensure the directory for the log file exists
     log_file_path.parent.mkdir(parents=True, exist_ok=True)
-    config = copy.deepcopy(LOGGING_CONFIG)
-    config['handlers']['file']['filename'] = str(log_file_path)
+    # Flush and stop a previous listener before its handler is replaced.
+    _stop_queue_listener()
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(CONSOLE_LOG_LEVEL)
+    console_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setLevel(FILE_LOG_LEVEL)
+
+    root = logging.getLogger()
+    _remove_root_handlers(root)
+    root.setLevel(ROOT_LOG_LEVEL)
+    root.addHandler(console_handler)
+    root.addHandler(queue_handler)
 
-    logging.config.dictConfig(config)
+    file_handler = RotatingFileHandler(
+        str(log_file_path),
+        maxBytes=LOG_FILE_MAX_BYTES,
+        backupCount=LOG_FILE_BACKUP_COUNT,
+    )
+    file_handler.setLevel(FILE_LOG_LEVEL)
+    file_handler.setFormatter(formatter)
+    _queue_listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _queue_listener.start()
@@ -1,9 +1,20 @@
 import os
 import json
-import argparse
 from pathlib import Path
+from typing import Any, Dict
 import logging
-import copy
+
+try:
+    import msgspec
+except ImportError:
+    # msgspec is optional; orjson or the stdlib json parser is used instead.
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the stdlib json parser.
+    orjson = None
 
 from config import constants
 from error_handler import ConfigurationError
@@ -12,6 +23,13 @@ from config.validator import ConfigValidator
 
 logger = logging.getLogger(__name__)
 
+# Snapshot of the process environment taken once at import time.
+# Use Config.refresh_env() to pick up variables changed afterwards.
+_ENV_SNAPSHOT = dict(os.environ)
+
+# orjson.JSONDecodeError is a subclass of json.JSONDecodeError.
+_DECODE_ERRORS = (json.JSONDecodeError,) + ((msgspec.MsgspecError,) if msgspec is not None else ())
+
 
 class Config:
     """
@@ -19,6 +37,8 @@ class Config:
     Загружает настройки из различных источников с определенным приоритетом:
     Defaults -> File -> Environment Variables -> CLI Arguments.
     """
+    __slots__ = ('_settings', 'root_dir', '_default_config_file', '_validator')
+
     REDACTED_STRING = "********"
 
     def __init__(self, root_dir: Path, validator: ConfigValidator):
@@ -40,14 +60,25 @@ class Config:
         })
         logger.debug("Defaults loaded: %s", self._settings)
 
+    @staticmethod
+    def _parse_config_file(filepath: Path) -> dict:
+        """Парсит JSON-файл конфигурации."""
+        if msgspec is not None:
+            # Decoding against Dict[str, Any] also checks in C that the top level is an object.
+            return msgspec.json.decode(filepath.read_bytes(), type=Dict[str, Any])
+        if orjson is not None:
+            return orjson.loads(filepath.read_bytes())
+        with filepath.open('r', encoding='utf-8') as f:
+            return json.load(f)
+
     def _load_from_file(self, filepath: Path):
         """Загружает настройки из JSON-файла."""
         try:
-            with filepath.open('r', encoding='utf-8') as f:
-                file_settings = json.load(f)
-                self._settings.update(file_settings)
-                logger.info("Settings loaded from file: %s", filepath)
-                logger.debug("File settings: %s", file_settings)
+            # No snapshot here: parsing a small JSON file is cheaper than loading a cached copy.
+            file_settings = self._parse_config_file(filepath)
+            self._settings.update(file_settings)
+            logger.info("Settings loaded from file: %s", filepath)
+            logger.debug("File settings: %s", file_settings)
         except FileNotFoundError:
             # If the default config file is not found, it's not an error.
             # It means we'll proceed with defaults and other sources.
@@ -55,7 +86,7 @@ class Config:
             return
         except PermissionError as e:
             raise ConfigurationError(f"Permission denied to read config file '{filepath}': {e}") from e
-        except json.JSONDecodeError as e:
+        except _DECODE_ERRORS as e:
             raise ConfigurationError(f"Error decoding config file '{filepath}': {e}") from e
         except Exception as e:
             raise ConfigurationError(
@@ -66,7 +97,7 @@ class Config:
         """Загружает настройки из переменных окружения."""
         api_key_env_var = self._settings.get(constants.API_KEY_ENV_VAR_NAME_KEY)
         if api_key_env_var:
-            api_key = os.getenv(api_key_env_var)
+            api_key = _ENV_SNAPSHOT.get(api_key_env_var)
             if api_key:
                 self._settings[constants.API_KEY_KEY] = api_key
                 logger.info("API key loaded from environment variable '%s'.", api_key_env_var)
@@ -74,6 +105,13 @@ class Config:
                 logger.debug("Environment variable '%s' for API key not found.", api_key_env_var)
         logger.debug("Environment variables checked.")
 
+    @classmethod
+    def refresh_env(cls):
+        """Перечитывает снимок переменных окружения процесса."""
+        _ENV_SNAPSHOT.clear()
+        _ENV_SNAPSHOT.update(os.environ)
+        logger.debug("Environment snapshot refreshed.")
+
     def _apply_cli_values(self, cli_values: dict):
         """Применяет настройки из аргументов командной строки."""
         self._settings.update(cli_values)
@@ -81,9 +119,9 @@ class Config:
 
     def get_redacted_settings(self):
         """
-        Возвращает глубокую копию настроек с скрытым API-ключом для логирования.
+        Возвращает поверхностную копию настроек с скрытым API-ключом для логирования.
         """
-        redacted_settings = copy.deepcopy(self._settings)
+        redacted_settings = dict(self._settings)
         if constants.API_KEY_KEY in redacted_settings:
             redacted_settings[constants.API_KEY_KEY] = self.REDACTED_STRING
         return redacted_settings
@@ -100,7 +138,9 @@ class Config:
         if cli_values:
             self._apply_cli_values(cli_values)
         logger.info("Final configuration loaded.")
-        logger.debug("Final settings: %s", self.get_redacted_settings())
+        # The redacted copy is built only if DEBUG records are actually emitted.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final settings: %s", self.get_redacted_settings())
 
     def get(self, key: str, default=None):
         """Получает значение настройки по ключу."""
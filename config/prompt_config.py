@@ -1,16 +1,17 @@
 # config/prompt_config.py
-import yaml
 from pathlib import Path
 from typing import Dict, Any, List
 
 from error_handler import ConfigurationError
 from config import constants
+from config.snapshot_cache import load_with_snapshot
 
 
 class PromptConfig:
     """
     Утилитарный класс для загрузки и валидации файла конфигурации промптов.
     """
+    __slots__ = ()
 
     @staticmethod
     def load_and_validate(file_path: Path) -> Dict[str, Any]:
@@ -27,36 +28,60 @@ class PromptConfig:
             ConfigurationError: Если файл не найден, некорректен или не проходит валидацию.
         """
         try:
-            with file_path.open('r', encoding='utf-8') as f:
-                prompts_data = yaml.safe_load(f)
-
-            if not isinstance(prompts_data, dict) or not prompts_data:
-                raise ConfigurationError(
-                    f"Содержимое файла конфигурации промптов '{file_path}' должно быть непустым словарем."
-                )
-
-            # Проверяем, что у каждого агента есть обязательный ключ 'system_prompt'
-            for agent_name, agent_config in prompts_data.items():
-                if not isinstance(agent_config, dict):
-                    raise ConfigurationError(
-                        f"Конфигурация для агента '{agent_name}' в файле '{file_path}' должна быть словарем."
-                    )
-                
-                if constants.SYSTEM_PROMPT_KEY not in agent_config:
-                    raise ConfigurationError(
-                        f"Отсутствует обязательный ключ '{constants.SYSTEM_PROMPT_KEY}' "
-                        f"для агента '{agent_name}' в файле '{file_path}'."
-                    )
-                
-                if not isinstance(agent_config[constants.SYSTEM_PROMPT_KEY], str):
-                    raise ConfigurationError(
-                        f"Значение для ключа '{constants.SYSTEM_PROMPT_KEY}' у агента '{agent_name}' "
-                        f"должно быть строкой."
-                    )
-
-            return prompts_data
+            prompts_data = load_with_snapshot(file_path, PromptConfig._parse)
+        except OSError as e:
+            raise ConfigurationError(f"Ошибка доступа к файлу конфигурации промптов '{file_path}': {e}") from e
+
+        # Все секции проверяются сразу, чтобы ошибка в любой из них была видна при запуске
+        for agent_name, agent_config in prompts_data.items():
+            PromptConfig.validate_agent_config(agent_name, agent_config, file_path)
+        return prompts_data
+
+    @staticmethod
+    def _parse(file_path: Path) -> Dict[str, Any]:
+        """Парсит YAML-файл с промптами и проверяет структуру верхнего уровня."""
+        # yaml импортируется только здесь: при попадании в кэш снимков он не нужен.
+        import yaml
+        # Используем C-загрузчик LibYAML, если PyYAML собран с его поддержкой.
+        try:
+            from yaml import CSafeLoader as SafeLoader
+        except ImportError:
+            from yaml import SafeLoader
 
+        try:
+            prompts_data = yaml.load(file_path.read_bytes(), Loader=SafeLoader)
         except yaml.YAMLError as e:
             raise ConfigurationError(f"Ошибка парсинга YAML в файле '{file_path}': {e}") from e
-        except OSError as e:
-            raise ConfigurationError(f"Ошибка доступа к файлу конфигурации промптов '{file_path}': {e}") from e
\ No newline at end of file
+
+        if not isinstance(prompts_data, dict) or not prompts_data:
+            raise ConfigurationError(
+                f"Содержимое файла конфигурации промптов '{file_path}' должно быть непустым словарем."
+            )
+
+        return prompts_data
+
+    @staticmethod
+    def validate_agent_config(agent_name: str, agent_config: Any, file_path: Path) -> None:
+        """
+        Проверяет, что конфигурация агента - словарь с обязательным строковым 'system_prompt'.
+
+        Raises:
+            ConfigurationError: Если секция агента не проходит валидацию.
+        """
+        if not isinstance(agent_config, dict):
+            raise ConfigurationError(
+                f"Конфигурация для агента '{agent_name}' в файле '{file_path}' должна быть словарем."
+            )
+
+        if constants.SYSTEM_PROMPT_KEY not in agent_config:
+            raise ConfigurationError(
+                f"Отсутствует обязательный ключ '{constants.SYSTEM_PROMPT_KEY}' "
+                f"для агента '{agent_name}' в файле '{file_path}'."
+            )
+
+        if not isinstance(agent_config[constants.SYSTEM_PROMPT_KEY], str):
+            raise ConfigurationError(
+                f"Значение для ключа '{constants.SYSTEM_PROMPT_KEY}' у агента '{agent_name}' "
+                f"должно быть строкой."
+            )
+
@@ -0,0 +1,79 @@
+# config/snapshot_cache.py
+"""
+Кэш снимков (snapshot) распарсенных конфигурационных файлов.
+
+Результат разбора файла сохраняется в JSON-файл в пользовательском кэше
+и переиспользуется при следующих запусках, пока не изменятся mtime и размер
+исходного файла. В кэш попадает только содержимое файлов: переменные окружения,
+аргументы CLI и API-ключ всегда применяются заново.
+
+Снимки хранятся в JSON, а не в pickle: чтение файла из каталога кэша не должно
+выполнять код. Данные, которые JSON не передает без потерь, не кэшируются.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "evocode"
+# Increment when the structure of cached data changes.
+SNAPSHOT_VERSION = 2
+
+
+def _snapshot_path(source_path: Path) -> Path:
+    digest = hashlib.sha1(str(source_path).encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{digest}.json"
+
+
+def load_with_snapshot(source_path: Path, parse: Callable[[Path], Any]) -> Any:
+    """
+    Возвращает результат `parse(source_path)`, используя снимок из кэша, если он актуален.
+
+    Args:
+        source_path (Path): Путь к исходному файлу конфигурации.
+        parse (Callable[[Path], Any]): Функция разбора (и валидации) файла.
+
+    Returns:
+        Any: Распарсенное содержимое файла.
+
+    Raises:
+        FileNotFoundError: Если исходный файл не существует.
+        Любые исключения, выброшенные `parse`; ошибочные результаты не кэшируются.
+    """
+    source_path = source_path.resolve()
+    st = source_path.stat()
+    key = [SNAPSHOT_VERSION, str(source_path), st.st_mtime_ns, st.st_size]
+    snapshot_path = _snapshot_path(source_path)
+
+    try:
+        snapshot = json.loads(snapshot_path.read_bytes())
+        if snapshot["key"] == key:
+            logger.debug("Using config snapshot for '%s'.", source_path)
+            return snapshot["data"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        # A corrupted or outdated snapshot is not an error; it is simply rebuilt.
+        logger.debug("Ignoring unreadable config snapshot '%s': %s", snapshot_path, e)
+
+    data = parse(source_path)
+
+    try:
+        payload = json.dumps({"key": key, "data": data}, ensure_ascii=False)
+        # Tuples, non-string keys etc. would come back changed; such data is not cached.
+        if json.loads(payload)["data"] != data:
+            logger.debug("Config '%s' does not round-trip through JSON; snapshot skipped.", source_path)
+            return data
+        # The cache directory is private to the user.
+        snapshot_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, snapshot_path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.debug("Could not write config snapshot '%s': %s", snapshot_path, e)
+
+    return data
@@ -1,34 +1,75 @@
 import logging
+import os
+import stat
+import functools
 from pathlib import Path
-from typing import Union
+from typing import Dict, Optional, Tuple, Union
 
 from error_handler import ConfigurationError, APIKeyError
 from config import constants
 
 logger = logging.getLogger(__name__)
 
+# (config_key, must_exist, is_file, is_dir)
+PathSpec = Tuple[str, bool, bool, bool]
+
+# Paths checked in every mode. The log file does not have to exist, so it is never stat'ed.
+COMMON_PATH_SPECS: Tuple[PathSpec, ...] = (
+    (constants.PROMPT_CONFIG_PATH_KEY, True, True, False),
+    (constants.LOG_FILE_KEY, False, False, False),
+)
+CLI_PATH_SPECS: Tuple[PathSpec, ...] = (
+    (constants.PROJECT_PATH_KEY, True, False, True),
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _to_absolute_path(path_val: Union[str, Path], root_dir: Path) -> Path:
+    """
+    Преобразует значение пути в абсолютный Path относительно root_dir.
+    Результат кэшируется: при повторной валидации (GUI, тесты) строки не разбираются заново.
+    """
+    resolved_path = Path(path_val)
+    if not resolved_path.is_absolute():
+        resolved_path = root_dir / resolved_path
+    return resolved_path
+
 
 class ConfigValidator:
     """
     Класс для инкапсуляции всей логики валидации конфигурации EvoCode.
     """
+    __slots__ = ()
 
-    def _resolve_and_validate_path(self, path_val: Union[str, Path], root_dir: Path, must_exist: bool = False, is_file: bool = False, is_dir: bool = False, config_key: str = None) -> Path:
+    @staticmethod
+    def _stat_path(path: Path, stat_cache: Optional[Dict[Path, os.stat_result]]) -> os.stat_result:
+        """
+        Выполняет один вызов os.stat для пути, переиспользуя результат из stat_cache.
+        """
+        if stat_cache is not None and path in stat_cache:
+            return stat_cache[path]
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise FileNotFoundError(f"Путь не существует: {path}") from None
+        if stat_cache is not None:
+            stat_cache[path] = st
+        return st
+
+    def _resolve_and_validate_path(self, path_val: Union[str, Path], root_dir: Path, must_exist: bool = False, is_file: bool = False, is_dir: bool = False, config_key: str = None, stat_cache: Optional[Dict[Path, os.stat_result]] = None) -> Path:
         """
         Вспомогательный метод для преобразования значения пути в абсолютный объект Path
         и выполнения базовой валидации.
+        Тип пути проверяется по результату единственного вызова os.stat.
         """
         try:
-            resolved_path = Path(path_val)
-            if not resolved_path.is_absolute():
-                resolved_path = root_dir / resolved_path
+            resolved_path = _to_absolute_path(path_val, root_dir)
 
             if must_exist:
-                if not resolved_path.exists():
-                    raise FileNotFoundError(f"Путь не существует: {resolved_path}")
-                if is_file and not resolved_path.is_file():
+                st = self._stat_path(resolved_path, stat_cache)
+                if is_file and not stat.S_ISREG(st.st_mode):
                     raise ValueError(f"Путь не является файлом: {resolved_path}")
-                if is_dir and not resolved_path.is_dir():
+                if is_dir and not stat.S_ISDIR(st.st_mode):
                     raise ValueError(f"Путь не является директорией: {resolved_path}")
 
             return resolved_path
@@ -39,9 +80,10 @@ class ConfigValidator:
             key_info = f" для ключа '{config_key}'" if config_key else ""
             raise ConfigurationError(f"Неожиданная ошибка при разрешении пути{key_info}: {e}") from e
 
-    def _set_and_validate_path_setting(self, config_data: dict, config_key: str, root_dir: Path, must_exist: bool = False, is_file: bool = False, is_dir: bool = False):
+    def _resolve_path_setting(self, config_data: dict, config_key: str, root_dir: Path, must_exist: bool = False, is_file: bool = False, is_dir: bool = False, stat_cache: Optional[Dict[Path, os.stat_result]] = None) -> Optional[Path]:
         """
-        Resolves and validates a path setting, updating the config_data dictionary.
+        Resolves and validates a path setting without modifying config_data.
+        Returns None if the optional setting is not specified.
         """
         path_val = config_data.get(config_key)
 
@@ -49,23 +91,33 @@ class ConfigValidator:
             if must_exist:
                 raise ConfigurationError(f"Обязательный путь для ключа '{config_key}' не указан.")
             else:
-                logger.debug(f"Path for '{config_key}' is None and not mandatory, skipping resolution.")
-                return
+                logger.debug("Path for '%s' is None and not mandatory, skipping resolution.", config_key)
+                return None
 
         if not isinstance(path_val, (str, Path)):
             raise ConfigurationError(
                 f"Значение для '{config_key}' должно быть строкой или объектом Path, получено: {type(path_val).__name__}."
             )
 
-        resolved_path = self._resolve_and_validate_path(
-            path_val, root_dir, must_exist=must_exist, is_file=is_file, is_dir=is_dir, config_key=config_key
+        return self._resolve_and_validate_path(
+            path_val, root_dir, must_exist=must_exist, is_file=is_file, is_dir=is_dir, config_key=config_key,
+            stat_cache=stat_cache
         )
-        config_data[config_key] = resolved_path
-        logger.debug(f"Path for '{config_key}' resolved to: {resolved_path}")
 
-    def _validate_cli_mode_settings(self, config_data: dict, root_dir: Path):
+    def _apply_path_settings(self, config_data: dict, root_dir: Path, path_specs: Tuple[PathSpec, ...], stat_cache: Optional[Dict[Path, os.stat_result]] = None):
+        """Resolves and validates path settings in order, writing them back into config_data."""
+        for config_key, must_exist, is_file, is_dir in path_specs:
+            resolved_path = self._resolve_path_setting(
+                config_data, config_key, root_dir, must_exist=must_exist, is_file=is_file, is_dir=is_dir,
+                stat_cache=stat_cache
+            )
+            if resolved_path is not None:
+                config_data[config_key] = resolved_path
+                logger.debug("Path for '%s' resolved to: %s", config_key, resolved_path)
+
+    def _validate_cli_mode_settings(self, config_data: dict, root_dir: Path, stat_cache: Optional[Dict[Path, os.stat_result]] = None):
         """Валидирует настройки, специфичные для режима CLI."""
-        self._set_and_validate_path_setting(config_data, constants.PROJECT_PATH_KEY, root_dir, must_exist=True, is_dir=True)
+        self._apply_path_settings(config_data, root_dir, CLI_PATH_SPECS, stat_cache)
 
         cycles = config_data.get(constants.CYCLES_KEY)
         if not isinstance(cycles, int) or cycles <= 0:
@@ -74,21 +126,16 @@ class ConfigValidator:
             )
         logger.debug("Настройки режима CLI проверены.")
 
-    def _resolve_and_validate_paths(self, config_data: dict, root_dir: Path):
-        """
-        Resolves relative paths to absolute Path objects and performs existence checks
-        for paths that are always expected or generally configured.
-        """
-        self._set_and_validate_path_setting(config_data, constants.PROMPT_CONFIG_PATH_KEY, root_dir, must_exist=True, is_file=True)
-        self._set_and_validate_path_setting(config_data, constants.LOG_FILE_KEY, root_dir, must_exist=False)
-        logger.debug("Common paths resolved and validated.")
-
     def validate(self, config_data: dict, root_dir: Path):
         """Выполняет базовую валидацию загруженных настроек."""
         current_mode = config_data.get(constants.MODE_KEY)
+        is_cli_mode = current_mode == constants.CLI_MODE
+        # Shared across all path keys so that each path is stat'ed at most once per validation.
+        stat_cache: Dict[Path, os.stat_result] = {}
 
         # First, resolve all paths to Path objects. This also performs existence checks where `must_exist=True`.
-        self._resolve_and_validate_paths(config_data, root_dir)
+        self._apply_path_settings(config_data, root_dir, COMMON_PATH_SPECS, stat_cache)
+        logger.debug("Common paths resolved and validated.")
 
         # Validate API key
         api_key = config_data.get(constants.API_KEY_KEY)
@@ -99,7 +146,7 @@ class ConfigValidator:
             )
 
         # Then, perform mode-specific validations based on the resolved paths.
-        if current_mode == constants.CLI_MODE:
-            self._validate_cli_mode_settings(config_data, root_dir)
+        if is_cli_mode:
+            self._validate_cli_mode_settings(config_data, root_dir, stat_cache)
 
-        logger.info("Конфигурация успешно проверена.")
\ No newline at end of file
+        logger.info("Конфигурация успешно проверена.")
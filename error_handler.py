@@ -1,5 +1,6 @@
 import logging
 import sys
+from typing import Optional
 from error_codes import ErrorCodes
 
 logger = logging.getLogger(__name__)
@@ -9,11 +10,15 @@ class EvoCodeError(Exception):
     """
     Базовый класс для всех пользовательских исключений EvoCode.
     Содержит сообщение об ошибке и соответствующий код выхода.
+    Код выхода задается атрибутом класса и может быть переопределен
+    для конкретного исключения аргументом exit_code.
     """
     exit_code = ErrorCodes.GENERAL_ERROR
 
-    def __init__(self, message: str):
+    def __init__(self, message: str, exit_code: Optional[ErrorCodes] = None):
         super().__init__(message)
+        if exit_code is not None:
+            self.exit_code = exit_code
 
 
 class ConfigurationError(EvoCodeError):
@@ -7,8 +7,13 @@
 """
 import logging
 import sys
-import argparse
+import functools
 from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    import argparse
 
 # --- ИСПРАВЛЕНИЕ: Настройка sys.path для корректного импорта из 'src' ---
 # Это необходимо делать ДО того, как мы попытаемся импортировать что-либо из 'src'.
@@ -37,8 +42,11 @@ from config.validator import ConfigValidator
 logger = logging.getLogger(__name__)
 
 
-def _parse_cli_arguments() -> argparse.Namespace:
-    """Парсит аргументы командной строки для приложения EvoCode."""
+@functools.cache
+def _build_parser() -> "argparse.ArgumentParser":
+    """Строит парсер аргументов командной строки (один раз на процесс)."""
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="EvoCode: AI-ассистент для эволюционного улучшения кода.",
         formatter_class=argparse.RawTextHelpFormatter
@@ -52,20 +60,93 @@ def _parse_cli_arguments() -> argparse.Namespace:
 
     parser_map = {"main": parser}
 
-    for sub_def in SUBPARSER_DEFINITIONS:
-        parser_name = sub_def["name"]
-        parser_kwargs = {"help": sub_def["help"]}
-        if sub_def["formatter_class"]:
-            parser_kwargs["formatter_class"] = sub_def["formatter_class"]
+    for parser_name, help_text, formatter_class in SUBPARSER_DEFINITIONS:
+        parser_kwargs = {"help": help_text}
+        if formatter_class:
+            parser_kwargs["formatter_class"] = getattr(argparse, formatter_class)
 
         sub_parser = subparsers.add_parser(parser_name, **parser_kwargs)
         parser_map[parser_name] = sub_parser
 
-    for arg_def in CLI_ARGUMENTS_DEFINITIONS:
-        target = arg_def["target_parser"]
-        parser_map[target].add_argument(*arg_def["args"], **arg_def["kwargs"])
+    for target, flags, kwargs in CLI_ARGUMENTS_DEFINITIONS:
+        parser_map[target].add_argument(*flags, **kwargs)
+
+    return parser
+
+
+def _build_fast_parse_tables() -> Tuple[
+    Dict[str, Dict[str, Tuple[str, Callable[[str], Any]]]], Dict[str, Dict[str, Any]], Dict[str, List[str]], frozenset
+]:
+    """
+    Строит таблицы для _fast_parse_args из CLI_ARGUMENTS_DEFINITIONS.
+
+    Returns:
+        Кортеж (опции, значения по умолчанию, обязательные dest, имена подкоманд);
+        первые три сгруппированы по имени целевого парсера.
+    """
+    options: Dict[str, Dict[str, Tuple[str, Callable[[str], Any]]]] = {}
+    defaults: Dict[str, Dict[str, Any]] = {}
+    required: Dict[str, List[str]] = {}
+    for target, flags, kwargs in CLI_ARGUMENTS_DEFINITIONS:
+        dest = kwargs["dest"]
+        for flag in flags:
+            options.setdefault(target, {})[flag] = (dest, kwargs.get("type", str))
+        defaults.setdefault(target, {})[dest] = kwargs.get("default")
+        if kwargs.get("required"):
+            required.setdefault(target, []).append(dest)
+    subcommands = frozenset(name for name, _, _ in SUBPARSER_DEFINITIONS)
+    return options, defaults, required, subcommands
+
+
+# Определения аргументов не меняются во время работы, поэтому таблицы строятся один раз
+_FAST_OPTIONS, _FAST_DEFAULTS, _FAST_REQUIRED, _FAST_SUBCOMMANDS = _build_fast_parse_tables()
+
+
+def _fast_parse_args(argv: List[str]) -> Optional[SimpleNamespace]:
+    """
+    Разбирает типичную командную строку по CLI_ARGUMENTS_DEFINITIONS без argparse.
+
+    Поддерживаются только полные имена опций (`--opt value` и `--opt=value`)
+    и имя подкоманды. Для всего остального (--help, сокращения, неизвестные
+    или некорректные аргументы) возвращает None, и разбор вместе с выводом
+    справки и ошибок выполняет argparse.
+    """
+    target = "main"
+    values: Dict[str, Any] = {**_FAST_DEFAULTS.get(target, {}), constants.MODE_KEY: None}
+    tokens = iter(argv)
+    for token in tokens:
+        if token.startswith("--"):
+            flag, has_value, value = token.partition("=")
+            spec = _FAST_OPTIONS.get(target, {}).get(flag)
+            if spec is None:
+                return None
+            if not has_value:
+                value = next(tokens, None)
+                if value is None or value.startswith("-"):
+                    return None
+            dest, convert = spec
+            try:
+                values[dest] = convert(value)
+            except (TypeError, ValueError):
+                return None
+        elif target == "main" and token in _FAST_SUBCOMMANDS:
+            # Опции основного парсера после подкоманды argparse не принимает.
+            target = token
+            values[constants.MODE_KEY] = token
+            values.update(_FAST_DEFAULTS.get(target, {}))
+        else:
+            return None
 
-    args = parser.parse_args()
+    if any(values[dest] is None for dest in _FAST_REQUIRED.get(target, ())):
+        return None
+    return SimpleNamespace(**values)
+
+
+def _parse_cli_arguments() -> Union["argparse.Namespace", SimpleNamespace]:
+    """Парсит аргументы командной строки для приложения EvoCode."""
+    args = _fast_parse_args(sys.argv[1:])
+    if args is None:
+        args = _build_parser().parse_args()
 
     # Если режим не указан в аргументах, используем режим по умолчанию
     if args.mode is None:
@@ -1,8 +1,11 @@
 # src/application.py
 # -*- coding: utf-8 -*-
+from __future__ import annotations
+
 import sys
+from collections.abc import Mapping
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Any, Optional
 import logging
 
 # ИСПРАВЛЕНИЕ: Импортируем ConfigurationError из правильного места
@@ -13,12 +16,12 @@ from error_handler import (
     MissingDependencyError
 )
 from error_codes import ErrorCodes
-from utils.dependency_checker import check_dependencies, CORE_DEPENDENCIES, GUI_DEPENDENCIES
+from utils.dependency_checker import check_dependencies, Dependency, CORE_DEPENDENCIES, GUI_DEPENDENCIES
 from config.manager import Config
 from config import constants
-from config.prompt_config import PromptConfig
 
-from evocode_core.exceptions import APIKeyNotFoundError
+# PromptConfig (PyYAML) и evocode_core (Gemini SDK) импортируются лениво,
+# в тех методах, где они действительно нужны.
 
 class Application:
     """
@@ -28,7 +31,7 @@ class Application:
     def __init__(self, config: Config):
         self.config = config
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.prompts: Optional[Dict[str, Any]] = None
+        self.prompts: Optional[Mapping[str, Any]] = None
 
     def _raise_missing_dependency_error(self, missing_dependencies: list[str]):
         """
@@ -42,11 +45,9 @@ class Application:
 
     def _check_dependencies(self):
         """Проверяет наличие необходимых зависимостей."""
-        gui_deps_with_qta = GUI_DEPENDENCIES + [{
-            "module_name": "qtawesome",
-            "friendly_name": "QtAwesome",
-            "install_command": "pip install qtawesome"
-        }]
+        gui_deps_with_qta = GUI_DEPENDENCIES + (
+            Dependency("qtawesome", "QtAwesome", "pip install qtawesome"),
+        )
         
         all_missing_deps = check_dependencies(CORE_DEPENDENCIES)
 
@@ -54,18 +55,19 @@ class Application:
             all_missing_deps.extend(check_dependencies(gui_deps_with_qta))
 
         missing_deps_friendly_names = [
-            dep_info['friendly_name'] for dep_info in all_missing_deps
+            dep_info.friendly_name for dep_info in all_missing_deps
         ]
 
         if missing_deps_friendly_names:
             self._raise_missing_dependency_error(missing_deps_friendly_names)
 
     @staticmethod
-    def _load_prompts_file(config_path: Path) -> Dict[str, Any]:
+    def _load_prompts_file(config_path: Path) -> Mapping[str, Any]:
         """Загружает и парсит YAML-файл с промптами, выполняя валидацию."""
+        from config.prompt_config import PromptConfig
         return PromptConfig.load_and_validate(config_path)
 
-    def _load_config(self) -> Optional[Dict[str, Any]]:
+    def _load_config(self) -> Optional[Mapping[str, Any]]:
         """Загружает и возвращает конфигурацию промптов приложения."""
         try:
             prompt_config_path = self.config.get(constants.PROMPT_CONFIG_PATH_KEY)
@@ -102,6 +104,7 @@ class Application:
 
     def _run_mode(self) -> int:
         """Запускает приложение в соответствующем режиме (CLI или GUI)."""
+        from evocode_core.exceptions import APIKeyNotFoundError
         try:
             if self.config.get(constants.MODE_KEY) == constants.CLI_MODE:
                 self._run_cli_mode()
@@ -4,9 +4,6 @@
 Пакет evocode_core.
 """
 
-from .orchestrator import Orchestrator
-# ИСПРАВЛЕНИЕ: Заменяем ToolAgent на BaseToolAgent, так как это основной класс для агентов с инструментами
-from .agents import BaseAgent, BaseToolAgent
 from .models import (
     ImprovementIdea,
     ImplementationPlan,
@@ -20,6 +17,23 @@ from .exceptions import (
     ContentBlockedError,
 )
 
+# Orchestrator и агенты тянут за собой клиент Gemini (google.generativeai), поэтому
+# загружаются только при первом обращении; модели и исключения легкие и импортируются сразу.
+_LAZY_ATTRS = {
+    "Orchestrator": ".orchestrator",
+    "BaseAgent": ".agents",
+    "BaseToolAgent": ".agents",
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
 # __all__ определяет публичный API пакета.
 __all__ = [
     "Orchestrator",
@@ -4,19 +4,29 @@
 Определяет иерархию AI-агентов и фабрику для их создания.
 Реализует надежный цикл "Рассуждай-Действуй" (ReAct).
 """
+import asyncio
+import functools
+import inspect
 import logging
 import json
-import re
+import os
 import time # Add this import
 from abc import ABC, abstractmethod
-from typing import Any, List, Callable, Dict, TypedDict, Literal, Type
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Callable, Dict, Optional, Tuple, TypedDict, Literal, Type
 from pathlib import Path
 
-from pydantic import ValidationError, BaseModel, parse_obj_as
+from pydantic import ValidationError, BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; fall back to the stdlib json parser.
+    orjson = None
 
 from .client import GeminiClient, GeminiResponse
 from .tools import FileSystemTools, finish, ToolError
-from .exceptions import CoreError
+from .exceptions import CoreError, GeminiAPIError
 
 log = logging.getLogger(__name__)
 
@@ -24,6 +34,13 @@ log = logging.getLogger(__name__)
 MAX_TOOL_CALLS = 10 # Максимальное количество последовательных вызовов инструментов
 MAX_CORE_ERROR_RETRIES = 3 # Максимальное количество повторных попыток при CoreError
 INITIAL_BACKOFF_SECONDS = 2 # Начальная задержка перед повторной попыткой (в секундах)
+TOOL_CONCURRENCY_LIMIT = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "4")) # Максимум параллельных вызовов инструментов
+AGENT_DEADLINE_SECONDS = float(os.getenv("EVOCODE_AGENT_DEADLINE_S", "600")) # Лимит времени работы агента с инструментами
+_CODE_FENCE = '```'
+# orjson.JSONDecodeError is a subclass of json.JSONDecodeError, so callers catch the stdlib exception.
+_json_loads = orjson.loads if orjson is not None else json.loads
+# Исправление частых ошибок JSON от модели за один проход: неэкранированные переводы строк и обратные кавычки
+_JSON_REPAIR_TABLE = str.maketrans({'\n': '\\n', '`': "'"})
 
 # --- Типизация ---
 AgentStatus = Literal['success', 'failure']
@@ -33,6 +50,36 @@ class AgentExecutionResult(TypedDict):
     status: AgentStatus
     message: Any # Может быть строкой или Pydantic моделью
 
+def _extract_fenced_block(text: str) -> Optional[str]:
+    """
+    Возвращает содержимое первого блока ```json ... ``` (или ``` ... ```) без окружающих пробелов,
+    либо None, если закрытого блока нет. Два поиска подстроки вместо регулярного выражения.
+    """
+    start = text.find(_CODE_FENCE)
+    if start == -1:
+        return None
+    start += len(_CODE_FENCE)
+    if text.startswith('json', start):
+        start += len('json')
+    end = text.find(_CODE_FENCE, start)
+    if end == -1:
+        return None
+    return text[start:end].strip()
+
+def _has_complete_json_fence(text: str, chunk: str) -> bool:
+    """
+    Проверяет, получен ли уже закрытый блок ```json ... ```, который будет разобран.
+
+    Блок может закрыться только фрагментом, содержащим обратную кавычку, поэтому
+    накопленный текст просматривается лишь для таких фрагментов.
+    """
+    return '`' in chunk and _extract_fenced_block(text) is not None
+
+@functools.cache
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Возвращает TypeAdapter для списка моделей; схема валидации строится один раз на модель."""
+    return TypeAdapter(List[model])
+
 # --- Базовые классы ---
 
 class BaseAgent(ABC):
@@ -48,28 +95,54 @@ class BaseAgent(ABC):
         """Основной метод, выполняющий логику агента."""
         pass
 
+    async def execute_async(self, context: Any, **kwargs) -> AgentExecutionResult:
+        """
+        Асинхронный вариант execute, позволяющий запускать независимых агентов
+        одновременно через asyncio.gather. По умолчанию синхронная логика
+        выполняется в отдельном потоке.
+        """
+        return await asyncio.to_thread(self.execute, context, **kwargs)
+
 class BaseToolAgent(BaseAgent):
     """
     Базовый класс для агентов, использующих инструменты.
     Реализует полноценный цикл "Рассуждай-Действуй" (ReAct).
     """
+    # Имена методов FileSystemTools, доступных агенту; дочерние классы задают свой набор.
+    TOOL_METHOD_NAMES: Tuple[str, ...] = ()
+    # Инструменты без побочных эффектов, пакет вызовов которых можно выполнять параллельно.
+    PARALLEL_SAFE_TOOLS = frozenset({'list_files', 'read_file', 'read_files'})
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        unknown = [name for name in cls.TOOL_METHOD_NAMES if not callable(getattr(FileSystemTools, name, None))]
+        if unknown:
+            raise TypeError(f"{cls.__name__}.TOOL_METHOD_NAMES содержит неизвестные инструменты: {unknown}")
+
     def __init__(self, system_prompt: str, project_path: Path, client: GeminiClient):
         super().__init__(system_prompt, client)
         self.project_path = project_path
         self.fs_tools = FileSystemTools(project_root=self.project_path)
-        self.tool_dispatch_table: Dict[str, Callable] = {}
-        self.available_tools: List[Callable] = []
-        self._register_tools()
-
-    @abstractmethod
-    def _register_tools(self):
-        """Дочерние классы должны реализовать этот метод для регистрации своих инструментов."""
-        self.tool_dispatch_table['finish'] = finish
+        # Набор инструментов не меняется за время жизни агента, поэтому собираем его один раз.
+        self.available_tools: Tuple[Callable, ...] = tuple(getattr(self.fs_tools, name) for name in self.TOOL_METHOD_NAMES)
+        self.tool_dispatch_table: Dict[str, Callable] = {'finish': finish, **dict(zip(self.TOOL_METHOD_NAMES, self.available_tools))}
+        self._tools_with_finish = self.available_tools + (finish,)
+        # (все параметры, обязательные параметры) каждого инструмента для проверки аргументов до вызова
+        self._tool_params: Dict[str, Tuple[frozenset, frozenset]] = {
+            name: self._signature_params(func) for name, func in self.tool_dispatch_table.items()
+        }
+
+    @staticmethod
+    def _signature_params(func: Callable) -> Tuple[frozenset, frozenset]:
+        """Возвращает имена всех и обязательных параметров инструмента."""
+        parameters = inspect.signature(func).parameters
+        required = frozenset(name for name, p in parameters.items() if p.default is inspect.Parameter.empty)
+        return frozenset(parameters), required
 
     def _execute_tool_call(self, function_call: Any) -> str:
         """Находит и выполняет инструмент из диспетчерского стола."""
         function_name = function_call.name
-        args = {key: value for key, value in (function_call.args or {}).items()}
+        args = dict(function_call.args) if function_call.args else {}
         
         log.info(f"Агент '{self.__class__.__name__}' запросил вызов: {function_name}({args})")
 
@@ -79,37 +152,111 @@ class BaseToolAgent(BaseAgent):
             log.error(error_msg)
             return error_msg
 
+        # Проверяем имена аргументов заранее, чтобы модель получила понятную подсказку за один ход
+        params, required = self._tool_params[function_name]
+        unknown = args.keys() - params
+        missing = required - args.keys()
+        if unknown or missing:
+            problems = []
+            if unknown:
+                problems.append(f"неизвестные аргументы: {', '.join(sorted(unknown))}")
+            if missing:
+                problems.append(f"не указаны обязательные аргументы: {', '.join(sorted(missing))}")
+            error_msg = (
+                f"Ошибка: некорректный вызов инструмента '{function_name}' ({'; '.join(problems)}). "
+                f"Допустимые параметры: {', '.join(sorted(params)) or 'нет'}."
+            )
+            log.error(error_msg)
+            return error_msg
+
         try:
             return func_to_call(**args)
         except (ToolError, TypeError) as e:
             log.error(f"Ошибка при выполнении инструмента '{function_name}': {e}")
             return f"Ошибка выполнения инструмента: {e}"
 
-    def execute(self, context: str, **kwargs) -> AgentExecutionResult:
-        on_activity_hook = kwargs.get('on_activity')
-        self.fs_tools.on_activity = on_activity_hook
+    def _execute_tool_call_safely(self, function_call: Any) -> str:
+        """Выполняет вызов инструмента, превращая любую ошибку в текст ответа для модели."""
+        try:
+            return self._execute_tool_call(function_call)
+        except Exception as e:
+            log.error(f"Непредвиденная ошибка инструмента '{function_call.name}': {e}", exc_info=True)
+            return f"Ошибка выполнения инструмента: {e}"
+
+    def _execute_tool_calls(self, function_calls: List[Any]) -> List[str]:
+        """
+        Выполняет пакет вызовов инструментов и возвращает результаты в исходном порядке.
+        Пакет из нескольких вызовов только читающих инструментов выполняется параллельно,
+        остальные пакеты - последовательно, так как запись в файлы не коммутативна.
+        """
+        if len(function_calls) < 2 or any(fc.name not in self.PARALLEL_SAFE_TOOLS for fc in function_calls):
+            return [self._execute_tool_call_safely(fc) for fc in function_calls]
+
+        # Пул живет только на время пакета, чтобы потоки не переживали агента
+        with ThreadPoolExecutor(
+            max_workers=min(TOOL_CONCURRENCY_LIMIT, len(function_calls)),
+            thread_name_prefix=f"{self.__class__.__name__}-tool",
+        ) as executor:
+            return list(executor.map(self._execute_tool_call_safely, function_calls))
 
+    def execute(self, context: str, **kwargs) -> AgentExecutionResult:
+        # Хуки действуют на все попытки цикла и снимаются только после последней
+        self.fs_tools.on_activity = kwargs.get('on_activity')
+        self.fs_tools.is_cancelled = kwargs.get('is_cancelled')
+        try:
+            # wait_cancel(timeout) -> True, если задача отменена во время ожидания
+            return self._execute_with_retries(context, kwargs.get('wait_cancel'))
+        finally:
+            self.fs_tools.on_activity = None
+            self.fs_tools.is_cancelled = None
+
+    def _execute_with_retries(self, context: str, wait_cancel: Optional[Callable[[float], bool]]) -> AgentExecutionResult:
+        """ReAct-цикл агента с повторными попытками при CoreError."""
         retries = 0
         backoff_time = INITIAL_BACKOFF_SECONDS
+        deadline = time.monotonic() + AGENT_DEADLINE_SECONDS
+        deadline_result: AgentExecutionResult = {
+            "status": "failure", "message": f"Превышен лимит времени работы агента ({AGENT_DEADLINE_SECONDS:g} сек)."
+        }
+
+        # Local aliases for the methods called on every ReAct turn
+        send_message = self.client.send_message
+        execute_tool_calls = self._execute_tool_calls
 
         while retries <= MAX_CORE_ERROR_RETRIES:
             try:
-                chat_session = self.client.start_tool_chat(self.system_prompt, self.available_tools + [finish])
-                response = self.client.send_message(chat_session, context)
+                chat_session = self.client.start_tool_chat(self.system_prompt, self._tools_with_finish)
+                response = send_message(chat_session, context)
 
                 final_message_content = None # To store the final message, whether tool call or text
 
                 for i in range(MAX_TOOL_CALLS):
-                    if function_call := response.get("function_call"):
-                        if function_call.name == 'finish':
-                            reason = (function_call.args or {}).get('reason', 'не указана')
+                    if time.monotonic() > deadline:
+                        log.error(f"Агент '{self.__class__.__name__}' превысил лимит времени ({AGENT_DEADLINE_SECONDS:g} сек).")
+                        return deadline_result
+
+                    if function_calls := response.get("function_calls"):
+                        # Calls after 'finish' in the same batch are discarded; the ones before it still run.
+                        finish_call = None
+                        for index, function_call in enumerate(function_calls):
+                            if function_call.name == 'finish':
+                                finish_call = function_call
+                                function_calls = function_calls[:index]
+                                break
+
+                        tool_responses = execute_tool_calls(function_calls)
+
+                        if finish_call is not None:
+                            reason = (finish_call.args or {}).get('reason', 'не указана')
                             log.info(f"Агент завершил работу. Причина: {reason}")
                             return {"status": "success", "message": f"Работа завершена. Причина: {reason}"}
-                        
-                        # If it's another tool call, execute it and continue
-                        tool_response = self._execute_tool_call(function_call)
-                        response_data = [{"function_response": {"name": function_call.name, "response": {"result": tool_response}}}]
-                        response = self.client.send_message(chat_session, response_data)
+
+                        # Otherwise send all tool results back in the order the calls were requested
+                        response_data = [
+                            {"function_response": {"name": function_call.name, "response": {"result": tool_response}}}
+                            for function_call, tool_response in zip(function_calls, tool_responses)
+                        ]
+                        response = send_message(chat_session, response_data)
                         final_message_content = None # Reset if a tool call was made
                     
                     elif text := response.get("text"):
@@ -137,15 +284,20 @@ class BaseToolAgent(BaseAgent):
             except CoreError as e:
                 log.error(f"CoreError в цикле агента '{self.__class__.__name__}' (попытка {retries + 1}/{MAX_CORE_ERROR_RETRIES + 1}): {e}", exc_info=True)
                 if retries < MAX_CORE_ERROR_RETRIES:
+                    if time.monotonic() + backoff_time > deadline:
+                        log.error(f"Повторная попытка агента '{self.__class__.__name__}' не уложится в лимит времени.")
+                        return deadline_result
                     log.info(f"Повторная попытка через {backoff_time} секунд...")
-                    time.sleep(backoff_time)
+                    if wait_cancel is None:
+                        time.sleep(backoff_time)
+                    elif wait_cancel(backoff_time):
+                        log.info(f"Повторные попытки агента '{self.__class__.__name__}' прерваны отменой задачи.")
+                        return {"status": "failure", "message": "Выполнение отменено пользователем."}
                     backoff_time *= 2 # Экспоненциальная задержка
                     retries += 1
                 else:
                     log.critical(f"Все {MAX_CORE_ERROR_RETRIES + 1} попыток исчерпаны для CoreError в агенте '{self.__class__.__name__}'. Завершение работы.")
                     return {"status": "failure", "message": f"Критическая ошибка: {e}. Все попытки исчерпаны."}
-            finally:
-                self.fs_tools.on_activity = None
 
 
 # --- Конкретные реализации агентов ---
@@ -158,72 +310,89 @@ class TextAgent(BaseAgent):
         if not response_str:
             raise CoreError("AI вернул пустой ответ.")
             
-        match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', response_str, re.DOTALL)
-        cleaned_str = match.group(1).strip() if match else response_str.strip()
+        fenced = _extract_fenced_block(response_str)
+        cleaned_str = fenced if fenced is not None else response_str.strip()
         
         try:
-            data = json.loads(cleaned_str)
+            data = _json_loads(cleaned_str)
         except json.JSONDecodeError as e:
+            if '\n' not in cleaned_str and '`' not in cleaned_str:
+                # Nothing to repair: a second parse of the same string would fail the same way.
+                raise CoreError(f"Ошибка парсинга JSON: {e}. Ответ AI: {cleaned_str[:300]}...") from e
             log.warning(f"Первая попытка парсинга JSON провалилась ({e}). Пробуем исправить строку...")
             try:
-                repaired_str = cleaned_str.replace('\n', '\\n').replace('`', "'")
-                data = json.loads(repaired_str)
+                repaired_str = cleaned_str.translate(_JSON_REPAIR_TABLE)
+                data = _json_loads(repaired_str)
                 log.info("Строка JSON успешно исправлена и распарсена.")
             except json.JSONDecodeError as e2:
                 raise CoreError(f"Ошибка парсинга JSON: {e2}. Ответ AI: {cleaned_str[:300]}...") from e2
         
         try:
-            return parse_obj_as(List[model], data) if isinstance(data, list) else model.model_validate(data)
+            return _list_adapter(model).validate_python(data) if isinstance(data, list) else model.model_validate(data)
         except ValidationError as e_pydantic:
             raise CoreError(f"Ошибка валидации Pydantic: {e_pydantic}. Данные: {str(data)[:300]}...") from e_pydantic
 
+    def _build_result(self, raw_text: str, expected_model: Optional[Type[BaseModel]]) -> AgentExecutionResult:
+        """Формирует результат агента из сгенерированного текста."""
+        if not expected_model:
+            return {"status": "success", "message": raw_text}
+        
+        parsed_data = self._parse_json_response(raw_text, expected_model)
+        return {"status": "success", "message": parsed_data}
+
     def execute(self, context: str, **kwargs) -> AgentExecutionResult:
         expected_model = kwargs.get('expected_model')
         try:
-            raw_text = self.client.generate_text(self.system_prompt, context)
-            if "Ошибка API" in raw_text:
-                 return {"status": "failure", "message": raw_text}
-
-            if not expected_model:
-                return {"status": "success", "message": raw_text}
-            
-            parsed_data = self._parse_json_response(raw_text, expected_model)
-            return {"status": "success", "message": parsed_data}
+            # The parser only uses the first fenced block, so the rest of a JSON response need not be awaited.
+            stop_when = _has_complete_json_fence if expected_model else None
+            raw_text = self.client.generate_text(self.system_prompt, context, stop_when=stop_when)
+            return self._build_result(raw_text, expected_model)
+        except GeminiAPIError as e:
+            # Ошибка API - неудачная попытка шага, а не критическая ошибка.
+            log.error(f"TextAgent получил ошибку API: {e}")
+            return {"status": "failure", "message": f"Ошибка API: {e}"}
         except CoreError as e:
             log.exception(f"TextAgent столкнулся с ошибкой: {e}")
             raise # Re-raise the CoreError
 
+    async def execute_async(self, context: str, **kwargs) -> AgentExecutionResult:
+        expected_model = kwargs.get('expected_model')
+        try:
+            stop_when = _has_complete_json_fence if expected_model else None
+            raw_text = await self.client.generate_text_async(self.system_prompt, context, stop_when=stop_when)
+            return self._build_result(raw_text, expected_model)
+        except GeminiAPIError as e:
+            log.error(f"TextAgent получил ошибку API: {e}")
+            return {"status": "failure", "message": f"Ошибка API: {e}"}
+        except CoreError as e:
+            log.exception(f"TextAgent столкнулся с ошибкой: {e}")
+            raise
+
 class ReadOnlyToolAgent(BaseToolAgent):
     """Агент с инструментами только для чтения."""
-    def _register_tools(self):
-        super()._register_tools()
-        read_tools = [self.fs_tools.list_files, self.fs_tools.read_file]
-        self.available_tools.extend(read_tools)
-        self.tool_dispatch_table.update({
-            'list_files': self.fs_tools.list_files,
-            'read_file': self.fs_tools.read_file,
-        })
+    TOOL_METHOD_NAMES = ('list_files', 'read_file', 'read_files')
 
 class QAAgent(ReadOnlyToolAgent):
     """Агент-QA, который может читать файлы и запускать тесты."""
-    def _register_tools(self):
-        super()._register_tools()
-        self.available_tools.append(self.fs_tools.run_tests)
-        self.tool_dispatch_table['run_tests'] = self.fs_tools.run_tests
+    TOOL_METHOD_NAMES = ReadOnlyToolAgent.TOOL_METHOD_NAMES + ('run_tests',)
 
 class ReadWriteToolAgent(ReadOnlyToolAgent):
     """Агент с полным доступом к файловой системе (чтение и запись)."""
-    def _register_tools(self):
-        super()._register_tools()
-        write_tools = [self.fs_tools.write_file, self.fs_tools.apply_patch]
-        self.available_tools.extend(write_tools)
-        self.tool_dispatch_table.update({
-            'write_file': self.fs_tools.write_file,
-            'apply_patch': self.fs_tools.apply_patch,
-        })
+    TOOL_METHOD_NAMES = ReadOnlyToolAgent.TOOL_METHOD_NAMES + ('write_file', 'apply_patch')
 
 # --- Фабрика Агентов ---
 
+# Соответствие имен агентов их классам; строится один раз при импорте модуля.
+AGENT_CLASSES: Dict[str, type] = {
+    'ideator': TextAgent,
+    'filter': TextAgent,
+    'planner': TextAgent,
+    'commit_message_generator': TextAgent,
+    'coder': ReadWriteToolAgent,
+    'test_writer': ReadWriteToolAgent,
+    'qa_agent': QAAgent,
+}
+
 def create_agent(
     agent_name: str,
     system_prompt: str,
@@ -231,16 +400,7 @@ def create_agent(
     project_path: Path
 ) -> BaseAgent:
     """Фабричная функция для создания экземпляров агентов по их имени."""
-    agent_map: Dict[str, type] = {
-        'ideator': TextAgent,
-        'filter': TextAgent,
-        'planner': TextAgent,
-        'commit_message_generator': TextAgent,
-        'coder': ReadWriteToolAgent,
-        'test_writer': ReadWriteToolAgent,
-        'qa_agent': QAAgent,
-    }
-    agent_class = agent_map.get(agent_name)
+    agent_class = AGENT_CLASSES.get(agent_name)
 
     if not agent_class:
         raise ValueError(f"Неизвестное имя агента: {agent_name}")
@@ -4,11 +4,13 @@
 Production-grade клиент для взаимодействия с API Google Gemini.
 Инкапсулирует логику запросов, обработку ошибок и повторные попытки.
 """
+import asyncio
 import os
 import logging
+import random
 import time
-from functools import wraps
-from typing import List, Callable, Any, Optional, Dict, Union, TypedDict
+from functools import lru_cache, wraps
+from typing import List, Callable, Any, Optional, Dict, Sequence, Tuple, Union, TypedDict
 
 try:
     import google.generativeai as genai
@@ -26,13 +28,58 @@ log = logging.getLogger(__name__)
 # --- Константы ---
 MAX_API_RETRIES = 3
 INITIAL_RETRY_DELAY_SECONDS = 25
+MAX_RETRY_DELAY_SECONDS = 60
 
 # --- Типизация для ответов от клиента ---
 class GeminiResponse(TypedDict, total=False):
     text: Optional[str]
-    function_call: Optional[Any] # Используем Any для совместимости
+    function_calls: Optional[List[Any]] # Используем Any для совместимости
+
+# --- Декораторы для повторных попыток ---
+def _retry_delay(e: Exception, attempt: int) -> Optional[float]:
+    """
+    Возвращает задержку перед повтором, если ошибка потенциально временная (429, 500, 503)
+    и попытки еще не исчерпаны, иначе None.
+    Используется экспоненциальная выдержка с полным джиттером (ограничена MAX_RETRY_DELAY_SECONDS),
+    чтобы параллельные агенты после 429 не повторяли запросы одновременно.
+    """
+    if isinstance(e, exceptions.GoogleAPICallError) and e.code in [429, 500, 503] and attempt < MAX_API_RETRIES - 1:
+        delay = random.uniform(0, min(MAX_RETRY_DELAY_SECONDS, INITIAL_RETRY_DELAY_SECONDS * (2 ** attempt)))
+        log.warning(
+            f"Ошибка API ({type(e).__name__}, код: {e.code}). Попытка {attempt + 1}/{MAX_API_RETRIES}. "
+            f"Повтор через {delay:.1f} сек. Оригинальное сообщение: {e}"
+        )
+        return delay
+    return None
+
+def _raise_api_error(e: exceptions.GoogleAPICallError):
+    """Преобразует невосстановимую ошибку вызова API в кастомное исключение."""
+    log.error(f"Невосстановимая ошибка вызова API (код: {e.code}): {e}", exc_info=True)
+    if e.code == 429:
+        raise GeminiRateLimitError(f"Превышен лимит запросов к Gemini API: {e}") from e
+    elif e.code == 503:
+        raise GeminiServiceUnavailableError(f"Сервис Gemini API временно недоступен: {e}") from e
+    elif e.code == 500:
+        raise GeminiInternalServerError(f"Внутренняя ошибка сервера Gemini API: {e}") from e
+    else:
+        raise GeminiAPIError(f"Неизвестная ошибка Gemini API (код: {e.code}): {e}") from e
+
+def _raise_retries_exhausted(last_exception: Optional[Exception]):
+    """Выбрасывает исключение на основе последней ошибки после исчерпания всех попыток."""
+    log.error(f"Не удалось выполнить запрос к API после {MAX_API_RETRIES} попыток. Последняя ошибка: {last_exception}")
+    if isinstance(last_exception, exceptions.GoogleAPICallError):
+        if last_exception.code == 429:
+            raise GeminiRateLimitError(f"Превышен лимит запросов к Gemini API после повторных попыток: {last_exception}") from last_exception
+        elif last_exception.code == 503:
+            raise GeminiServiceUnavailableError(f"Сервис Gemini API недоступен после повторных попыток: {last_exception}") from last_exception
+        elif last_exception.code == 500:
+            raise GeminiInternalServerError(f"Внутренняя ошибка сервера Gemini API после повторных попыток: {last_exception}") from last_exception
+        else:
+            raise GeminiAPIError(f"Неизвестная ошибка Gemini API после повторных попыток (код: {last_exception.code}): {last_exception}") from last_exception
+
+    # Фоллбэк на случай, если цикл завершился без last_exception (теоретически невозможно)
+    raise CoreError("Не удалось выполнить запрос к API после нескольких попыток без известной последней ошибки.")
 
-# --- Декоратор для повторных попыток ---
 def retry_on_api_error(func: Callable) -> Callable:
     """
     Декоратор для обработки ошибок API с экспоненциальной выдержкой.
@@ -45,63 +92,73 @@ def retry_on_api_error(func: Callable) -> Callable:
             try:
                 return func(*args, **kwargs)
             # Пропускаем наши кастомные ошибки, чтобы не оборачивать их в CoreError
-            except (ContentBlockedError, APIKeyNotFoundError):
+            except CoreError:
                 raise
             except exceptions.GoogleAPICallError as e:
                 last_exception = e
-                # Проверяем, является ли ошибка потенциально временной (429, 500, 503)
-                if e.code in [429, 500, 503] and attempt < MAX_API_RETRIES - 1:
-                    delay = INITIAL_RETRY_DELAY_SECONDS * (2 ** attempt)
-                    log.warning(
-                        f"Ошибка API ({type(e).__name__}, код: {e.code}). Попытка {attempt + 1}/{MAX_API_RETRIES}. "
-                        f"Повтор через {delay} сек. Оригинальное сообщение: {e}"
-                    )
+                delay = _retry_delay(e, attempt)
+                if delay is not None:
                     time.sleep(delay)
                     continue
-
-                # Если ошибка не предполагает повторных попыток или попытки исчерпаны,
-                # выбрасываем кастомное исключение
-                log.error(f"Невосстановимая ошибка вызова API (код: {e.code}): {e}", exc_info=True)
-                if e.code == 429:
-                    raise GeminiRateLimitError(f"Превышен лимит запросов к Gemini API: {e}") from e
-                elif e.code == 503:
-                    raise GeminiServiceUnavailableError(f"Сервис Gemini API временно недоступен: {e}") from e
-                elif e.code == 500:
-                    raise GeminiInternalServerError(f"Внутренняя ошибка сервера Gemini API: {e}") from e
-                else:
-                    raise GeminiAPIError(f"Неизвестная ошибка Gemini API (код: {e.code}): {e}") from e
+                _raise_api_error(e)
             except Exception as e: # Ловим любые другие неожиданные ошибки
                 log.error(f"Неожиданная ошибка при вызове API: {e}", exc_info=True)
                 raise CoreError(f"Неожиданная ошибка: {e}") from e
 
         # Этот блок выполнится, только если цикл завершился (все попытки провалились)
-        log.error(f"Не удалось выполнить запрос к API после {MAX_API_RETRIES} попыток. Последняя ошибка: {last_exception}")
-        # Создаем и выбрасываем исключение на основе последней зафиксированной ошибки
-        if isinstance(last_exception, exceptions.GoogleAPICallError):
-            if last_exception.code == 429:
-                raise GeminiRateLimitError(f"Превышен лимит запросов к Gemini API после повторных попыток: {last_exception}") from last_exception
-            elif last_exception.code == 503:
-                raise GeminiServiceUnavailableError(f"Сервис Gemini API недоступен после повторных попыток: {last_exception}") from last_exception
-            elif last_exception.code == 500:
-                raise GeminiInternalServerError(f"Внутренняя ошибка сервера Gemini API после повторных попыток: {last_exception}") from last_exception
-            else:
-                raise GeminiAPIError(f"Неизвестная ошибка Gemini API после повторных попыток (код: {last_exception.code}): {last_exception}") from last_exception
-        
-        # Фоллбэк на случай, если цикл завершился без last_exception (теоретически невозможно)
-        raise CoreError("Не удалось выполнить запрос к API после нескольких попыток без известной последней ошибки.")
+        _raise_retries_exhausted(last_exception)
+
+    return wrapper
+
+def retry_on_api_error_async(func: Callable) -> Callable:
+    """
+    Асинхронный вариант retry_on_api_error для корутин.
+    Ожидание между попытками не блокирует цикл событий (asyncio.sleep).
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> Any:
+        last_exception = None
+        for attempt in range(MAX_API_RETRIES):
+            try:
+                return await func(*args, **kwargs)
+            except CoreError:
+                raise
+            except exceptions.GoogleAPICallError as e:
+                last_exception = e
+                delay = _retry_delay(e, attempt)
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    continue
+                _raise_api_error(e)
+            except Exception as e:
+                log.error(f"Неожиданная ошибка при вызове API: {e}", exc_info=True)
+                raise CoreError(f"Неожиданная ошибка: {e}") from e
+
+        _raise_retries_exhausted(last_exception)
 
     return wrapper
 
+@lru_cache(maxsize=1)
+def _configure_genai():
+    """
+    Выполняет глобальную конфигурацию genai один раз на процесс.
+    Если API-ключ не найден, исключение не кэшируется и следующий вызов повторит попытку.
+    """
+    api_key = os.environ.get('GEMINI_API_KEY') or os.environ.get('EVOCODE_API_KEY')
+    if not api_key:
+        raise APIKeyNotFoundError("Переменная окружения для API ключа не найдена.")
+    genai.configure(api_key=api_key)
+    log.info("Клиент Gemini успешно сконфигурирован.")
+
 class GeminiClient:
     """
     Клиент для работы с Google Gemini API, инкапсулирующий конфигурацию и сессии.
     """
-    _is_configured = False
     PRO_MODEL_NAME = "gemini-2.5-flash"
     FLASH_MODEL_NAME = "gemini-2.0-flash"
 
     def __init__(self):
-        self._ensure_configured()
+        _configure_genai()
         self.safety_settings = {
             HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
             HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
@@ -109,27 +166,41 @@ class GeminiClient:
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
         }
         self.generation_config = {"temperature": 0.2}
+        # Модели не хранят состояние диалога, поэтому их можно переиспользовать между вызовами.
+        self._model_cache: Dict[Tuple[str, str, Tuple[str, ...]], "genai.GenerativeModel"] = {}
 
-    def _ensure_configured(self):
-        """Гарантирует, что глобальная конфигурация genai вызывается только один раз."""
-        if not GeminiClient._is_configured:
-            api_key = os.environ.get('GEMINI_API_KEY') or os.environ.get('EVOCODE_API_KEY')
-            if not api_key:
-                raise APIKeyNotFoundError("Переменная окружения для API ключа не найдена.")
-            genai.configure(api_key=api_key)
-            GeminiClient._is_configured = True
-            log.info("Клиент Gemini успешно сконфигурирован.")
+    def _text_model(self, system_prompt: str) -> "genai.GenerativeModel":
+        """Возвращает (из кэша) менее мощную модель для генерации простого текста."""
+        key = (self.FLASH_MODEL_NAME, system_prompt, ())
+        model = self._model_cache.get(key)
+        if model is None:
+            model = self._model_cache[key] = genai.GenerativeModel(
+                self.FLASH_MODEL_NAME,
+                system_instruction=system_prompt,
+                safety_settings=self.safety_settings
+            )
+        return model
 
-    @retry_on_api_error
-    def generate_text(self, system_prompt: str, user_prompt: str) -> str:
-        """Генерирует простой текстовый ответ, используя менее мощную модель."""
-        log.info("Запрос на генерацию текста...")
-        model = genai.GenerativeModel(
-            self.FLASH_MODEL_NAME,
-            system_instruction=system_prompt,
-            safety_settings=self.safety_settings
-        )
-        response = model.generate_content(user_prompt)
+    def _tool_model(self, system_prompt: str, tools: Sequence[Callable]) -> "genai.GenerativeModel":
+        """
+        Возвращает (из кэша) мощную модель с инструментами.
+        Схема инструментов строится из их сигнатур, поэтому ключом служат их квалифицированные имена.
+        """
+        key = (self.PRO_MODEL_NAME, system_prompt, tuple(getattr(t, '__qualname__', repr(t)) for t in tools))
+        model = self._model_cache.get(key)
+        if model is None:
+            model = self._model_cache[key] = genai.GenerativeModel(
+                self.PRO_MODEL_NAME,
+                system_instruction=system_prompt,
+                tools=tools,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings
+            )
+        return model
+
+    @staticmethod
+    def _extract_text(response: Any) -> str:
+        """Извлекает текст из ответа generate_content."""
         if not response.parts and hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
             raise ContentBlockedError(f"Ответ был заблокирован: {response.prompt_feedback.block_reason.name}")
         
@@ -139,38 +210,109 @@ class GeminiClient:
         except ValueError as e:
             # Обработка случая, когда модель возвращает function_call вместо текста
             log.warning(f"Не удалось преобразовать ответ в текст (возможно, был возвращен function_call): {e}")
-            return "[AI-агент вернул нетекстовый ответ, который не удалось обработать]"
+            raise GeminiAPIError("AI-агент вернул нетекстовый ответ, который не удалось обработать.") from e
+
+    @classmethod
+    def _chunk_text(cls, chunk: Any) -> Optional[str]:
+        """Текст фрагмента потокового ответа; None для служебных фрагментов без содержимого."""
+        if not chunk.parts and not (hasattr(chunk, 'prompt_feedback') and chunk.prompt_feedback.block_reason):
+            return None
+        return cls._extract_text(chunk)
+
+    @retry_on_api_error
+    def generate_text(self, system_prompt: str, user_prompt: str, stop_when: Optional[Callable[[str, str], bool]] = None) -> str:
+        """
+        Генерирует простой текстовый ответ, используя менее мощную модель.
+
+        Если задан stop_when, ответ читается потоком, и чтение прекращается, как только
+        stop_when(накопленный текст, новый фрагмент) вернет True: окончания генерации ждать не нужно.
+        """
+        log.info("Запрос на генерацию текста...")
+        model = self._text_model(system_prompt)
+        if stop_when is None:
+            return self._extract_text(model.generate_content(user_prompt))
 
-    def start_tool_chat(self, system_prompt: str, tools: List[Callable]) -> ChatSession:
+        # Один растущий буфер: ответ не склеивается заново на каждом фрагменте
+        accumulated = ""
+        for chunk in model.generate_content(user_prompt, stream=True):
+            text = self._chunk_text(chunk)
+            if text is None:
+                continue
+            accumulated += text
+            if stop_when(accumulated, text):
+                log.debug("Чтение потокового ответа остановлено досрочно.")
+                break
+        return accumulated
+
+    @retry_on_api_error_async
+    async def generate_text_async(self, system_prompt: str, user_prompt: str, stop_when: Optional[Callable[[str, str], bool]] = None) -> str:
+        """Асинхронный вариант generate_text: ожидание ответа API не блокирует поток."""
+        log.info("Асинхронный запрос на генерацию текста...")
+        model = self._text_model(system_prompt)
+        if stop_when is None:
+            return self._extract_text(await model.generate_content_async(user_prompt))
+
+        # Один растущий буфер: ответ не склеивается заново на каждом фрагменте
+        accumulated = ""
+        async for chunk in await model.generate_content_async(user_prompt, stream=True):
+            text = self._chunk_text(chunk)
+            if text is None:
+                continue
+            accumulated += text
+            if stop_when(accumulated, text):
+                log.debug("Чтение потокового ответа остановлено досрочно.")
+                break
+        return accumulated
+
+    def start_tool_chat(self, system_prompt: str, tools: Sequence[Callable]) -> ChatSession:
         """Начинает новую сессию чата с инструментами, используя мощную модель."""
         log.info("Запуск новой сессии чата с инструментами...")
-        model = genai.GenerativeModel(
-            self.PRO_MODEL_NAME,
-            system_instruction=system_prompt,
-            tools=tools,
-            generation_config=self.generation_config,
-            safety_settings=self.safety_settings
-        )
-        return model.start_chat(enable_automatic_function_calling=False)
+        return self._tool_model(system_prompt, tools).start_chat(enable_automatic_function_calling=False)
 
-    @retry_on_api_error
-    def send_message(self, chat_session: ChatSession, message: Union[str, List[Dict]]) -> GeminiResponse:
-        """Отправляет сообщение в чат и парсит ответ в типизированный словарь."""
-        log.info(f"Отправка сообщения в чат: {str(message)[:150]}...")
-        response = chat_session.send_message(message)
-        
+    @staticmethod
+    def _parse_chat_response(response: Any) -> GeminiResponse:
+        """Парсит ответ чата в типизированный словарь."""
         if not response.candidates or not response.candidates[0].content.parts:
             raise CoreError("AI вернул пустой или невалидный ответ.")
 
-        # ИСПРАВЛЕНИЕ: Проверяем все части на наличие валидного вызова функции
+        # Один проход по частям ответа: собираем все вызовы функций (модель может запросить
+        # несколько инструментов за один ответ) и текстовые части.
+        function_calls = []
+        texts = []
+        has_other_parts = False
         for part in response.candidates[0].content.parts:
-            if hasattr(part, 'function_call') and part.function_call.name:
-                return {"function_call": part.function_call}
-        
-        # Если вызовов функции нет, значит, ожидаем текст.
+            function_call = getattr(part, 'function_call', None)
+            if function_call and function_call.name:
+                function_calls.append(function_call)
+            elif "text" in part:
+                texts.append(part.text)
+            else:
+                has_other_parts = True
+
+        if function_calls:
+            return {"function_calls": function_calls}
+        if not has_other_parts:
+            # Склеиваем так же, как response.text в SDK.
+            return {"text": "\n".join(texts)}
+
+        # Прочие части (например, результат выполнения кода) преобразует SDK.
         # Защищаемся от ошибки конвертации на случай смешанного контента.
         try:
             return {"text": response.text}
         except ValueError as e:
             log.warning(f"Не удалось извлечь текст из ответа, который не содержал function_call. Ошибка: {e}")
-            raise CoreError("AI вернул смешанный или невалидный ответ (не текст и не function_call).") from e
\ No newline at end of file
+            raise CoreError("AI вернул смешанный или невалидный ответ (не текст и не function_call).") from e
+
+    @retry_on_api_error
+    def send_message(self, chat_session: ChatSession, message: Union[str, List[Dict]]) -> GeminiResponse:
+        """Отправляет сообщение в чат и парсит ответ в типизированный словарь."""
+        log.info(f"Отправка сообщения в чат: {str(message)[:150]}...")
+        response = chat_session.send_message(message)
+        return self._parse_chat_response(response)
+
+    @retry_on_api_error_async
+    async def send_message_async(self, chat_session: ChatSession, message: Union[str, List[Dict]]) -> GeminiResponse:
+        """Асинхронный вариант send_message."""
+        log.info(f"Асинхронная отправка сообщения в чат: {str(message)[:150]}...")
+        response = await chat_session.send_message_async(message)
+        return self._parse_chat_response(response)
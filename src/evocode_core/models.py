@@ -8,44 +8,50 @@
 получаемых от LLM, что критически важно для стабильности всего конвейера.
 """
 from __future__ import annotations
+from functools import lru_cache
 from typing import List, Optional, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 # Тип для классификации идей по улучшению
 ImprovementType = Literal['REFACTORING', 'BUG_FIX', 'FEATURE', 'TESTING', 'DOCUMENTATION', 'STYLE']
 
+# Общая конфигурация контрактов: экземпляры неизменяемы, лишние поля от LLM отбрасываются
+CONTRACT_MODEL_CONFIG = ConfigDict(frozen=True, extra='ignore')
+
 class ImprovementIdea(BaseModel):
     """
     Структура для описания одной конкретной идеи по улучшению кода.
     Генерируется Агентом 1 (Ideator).
     """
+    model_config = CONTRACT_MODEL_CONFIG
+
     id: int = Field(
         ...,
         description="Уникальный порядковый номер идеи в списке.",
-        example=1
+        json_schema_extra={'example': 1}
     )
     title: str = Field(
         ...,
         description="Краткий, емкий заголовок идеи (до 10 слов).",
-        example="Рефакторинг функции calculate_statistics"
+        json_schema_extra={'example': "Рефакторинг функции calculate_statistics"}
     )
     description: str = Field(
         ...,
         description="Подробное описание улучшения: что не так сейчас и почему предлагаемое изменение сделает код лучше.",
-        example="Текущая функция превышает 50 строк и нарушает Принцип Единственной Ответственности. Ее следует разбить на три более мелкие функции: для загрузки данных, их обработки и сохранения результата."
+        json_schema_extra={'example': "Текущая функция превышает 50 строк и нарушает Принцип Единственной Ответственности. Ее следует разбить на три более мелкие функции: для загрузки данных, их обработки и сохранения результата."}
     )
     priority: float = Field(
         ...,
         description="Приоритет идеи от 0.0 до 1.0, где 1.0 - самый высокий.",
         ge=0.0,
         le=1.0,
-        example=0.9
+        json_schema_extra={'example': 0.9}
     )
     type: ImprovementType = Field(
         ...,
         description="Тип улучшения из предопределенного списка: 'REFACTORING', 'BUG_FIX', 'FEATURE', 'TESTING', 'DOCUMENTATION', 'STYLE'.",
-        example="REFACTORING"
+        json_schema_extra={'example': "REFACTORING"}
     )
 
 
@@ -54,15 +60,17 @@ class ImplementationPlan(BaseModel):
     Структура для описания пошагового плана внедрения идеи.
     Генерируется Агентом 3 (Planner).
     """
+    model_config = CONTRACT_MODEL_CONFIG
+
     description: str = Field(
         ...,
         description="Детальное, пошаговое описание того, как именно нужно изменить код для реализации идеи. Должно быть понятно другому программисту или AI. Формат: однострочный текст, шаги разделены через ' -> '.",
-        example="1. Открыть файл 'data_processor.py'. -> 2. Найти функцию 'calculate_statistics'. -> 3. Создать новую функцию 'load_data_from_db(query: str) -> pd.DataFrame'. -> ..."
+        json_schema_extra={'example': "1. Открыть файл 'data_processor.py'. -> 2. Найти функцию 'calculate_statistics'. -> 3. Создать новую функцию 'load_data_from_db(query: str) -> pd.DataFrame'. -> ..."}
     )
     code_diff: Optional[str] = Field(
         None,
         description="(Опционально) Предлагаемые изменения в формате diff/patch для автоматического применения.",
-        example="--- a/data_processor.py\n+++ b/data_processor.py\n@@ -10,5 +10,7 @@\n- old_line()\n+ new_line()"
+        json_schema_extra={'example': "--- a/data_processor.py\n+++ b/data_processor.py\n@@ -10,5 +10,7 @@\n- old_line()\n+ new_line()"}
     )
 
 
@@ -71,6 +79,8 @@ class ValidationResult(BaseModel):
     Базовая модель для всех результатов валидации.
     Определяет общий формат ответа для проверяющих агентов.
     """
+    model_config = CONTRACT_MODEL_CONFIG
+
     is_ok: bool = Field(
         ...,
         description="Результат проверки: True, если проверка пройдена успешно, иначе False."
@@ -78,7 +88,7 @@ class ValidationResult(BaseModel):
     feedback: Optional[str] = Field(
         None,
         description="Конструктивная обратная связь в случае неудачи (is_ok=False). Должна объяснять, что именно нужно исправить.",
-        example="План не учитывает случай, когда входные данные пусты. Необходимо добавить проверку на пустой DataFrame."
+        json_schema_extra={'example': "План не учитывает случай, когда входные данные пусты. Необходимо добавить проверку на пустой DataFrame."}
     )
 
 
@@ -102,6 +112,8 @@ class TestResult(BaseModel):
     Структура, содержащая сгенерированные тесты и результат их (симулированного) прогона.
     Генерируется Агентом 7 (Tester).
     """
+    model_config = CONTRACT_MODEL_CONFIG
+
     is_passing: bool = Field(
         ...,
         description="Проходят ли сгенерированные тесты: True или False."
@@ -109,5 +121,21 @@ class TestResult(BaseModel):
     details: str = Field(
         ...,
         description="Полный код сгенерированных тестов с использованием pytest.",
-        example="import pytest\nfrom my_module import new_function\n\ndef test_new_function():\n    assert new_function(2) == 4"
-    )
\ No newline at end of file
+        json_schema_extra={'example': "import pytest\nfrom my_module import new_function\n\ndef test_new_function():\n    assert new_function(2) == 4"}
+    )
+
+
+# Адаптеры строятся один раз при импорте и переиспользуются для (де)сериализации
+IDEA_ADAPTER = TypeAdapter(List[ImprovementIdea])
+PLAN_ADAPTER = TypeAdapter(ImplementationPlan)
+
+
+@lru_cache(maxsize=256)
+def dump_json_cached(model: BaseModel) -> str:
+    """
+    Возвращает `model.model_dump_json()`, сериализуя каждую модель не более одного раза.
+
+    Модели-контракты неизменяемы (frozen) и поэтому хешируемы: равные по содержимому
+    экземпляры дают одинаковый JSON и делят одну запись кэша.
+    """
+    return model.model_dump_json()
@@ -4,25 +4,95 @@
 Главный класс-оркестратор, управляющий адаптивным процессом
 эволюционного улучшения кода с использованием Git для безопасности.
 """
-import json
+import os
 import re
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 # ИСПРАВЛЕНИЕ: Добавляем tuple из typing для корректной аннотации
 from typing import Dict, Any, Optional, List, Type, Callable, TypeVar, TypedDict, Tuple
 
 from .agents import create_agent, BaseAgent, AgentExecutionResult
-from .models import ImprovementIdea, ImplementationPlan
+from .models import ImprovementIdea, ImplementationPlan, IDEA_ADAPTER, dump_json_cached
 from .exceptions import CoreError
 from .client import GeminiClient
-from .tools import FileSystemTools
+from .tools import FileSystemTools, EXCLUDED_DIR_NAMES, MAX_READ_WORKERS
 
 T = TypeVar('T')
 
+# Путь содержит исключенную директорию как отдельный компонент (для явно переданных путей)
+_EXCLUDED_PATH_RE = re.compile(
+    r'(?:^|[\\/])(?:' + '|'.join(map(re.escape, sorted(EXCLUDED_DIR_NAMES))) + r')(?:[\\/]|$)'
+)
+
+# Признаки успешного вердикта QA; поиск без копирования сообщения через .lower()
+_QA_OK_RE = re.compile(r'успех|пройдены', re.IGNORECASE)
+
+# --- Шаблоны задач для агентов пайплайна изменения кода ---
+CODER_TASK_TEMPLATE = (
+    "ИДЕЯ: {title} - {description}\n"
+    "ПЛАН: {plan}\n\n"
+    "Выполни этот план, используя инструменты. Предпочитай `apply_patch`."
+)
+CODER_RETRY_TEMPLATE = "Твоя предыдущая попытка провалилась. Ошибка: {error}. Проанализируй ошибку и попробуй еще раз, исправив свой подход."
+TEST_WRITER_TASK_TEMPLATE = "Агент-кодер внес изменения: '{changes}'. Напиши или обнови pytest тесты."
+TEST_WRITER_FAILED_TEMPLATE = "Твои изменения работают, но агент-тестировщик не смог написать для них тесты. Ошибка: {error}. Возможно, код нетестируемый? Попробуй исправить."
+QA_TASK = "Кодер внес изменения, тестировщик написал тесты. Запусти тесты и вынеси вердикт."
+QA_FAILED_TEMPLATE = (
+    "Твоя предыдущая попытка провалила проверку качества. Отчет от QA: '{report}'.\n\n"
+    "Ты внес следующие изменения: '{changes}'.\n\n"
+    "Вот АКТУАЛЬНОЕ состояние кода:\n{context}\n\n"
+    "ИСПРАВЬ ЭТУ ОШИБКУ."
+)
+
+
+def _iter_py_files(root: Path):
+    """Рекурсивно перечисляет .py-файлы, не заходя в служебные директории."""
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name not in EXCLUDED_DIR_NAMES:
+                yield from _iter_py_files(Path(entry.path))
+        elif entry.name.endswith('.py') and entry.is_file():
+            yield Path(entry.path)
+
+
+def _read_file_text(path: Path) -> str:
+    """Читает файл целиком одним вызовом read() и декодирует его как UTF-8."""
+    return path.read_bytes().decode('utf-8')
+
+
+def _read_many(paths: List[Path]) -> List[Tuple[Optional[str], Optional[BaseException]]]:
+    """
+    Читает файлы (параллельно, если их несколько) и возвращает пары (текст, ошибка).
+
+    Ошибка чтения отдельного файла не прерывает пакет: для него возвращается (None, исключение).
+    """
+    if len(paths) > 1:
+        # Чтение с диска перекрывается между файлами; успех и ошибка разделяются через future.exception()
+        with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(paths))) as executor:
+            futures = [executor.submit(_read_file_text, path) for path in paths]
+        return [(None, error) if (error := future.exception()) is not None else (future.result(), None)
+                for future in futures]
+    results = []
+    for path in paths:
+        try:
+            results.append((_read_file_text(path), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+
 class ProgressHooks(TypedDict, total=False):
     on_stage_change: Callable[[str], None]
     on_idea_approved: Callable[[ImprovementIdea], None]
     on_plan_approved: Callable[[ImplementationPlan], None]
     is_cancelled: Callable[[], bool]
+    wait_cancel: Callable[[float], bool]
     on_file_activity: Callable[[str], None]
 
 class Orchestrator:
@@ -33,20 +103,31 @@ class Orchestrator:
     MAX_REPAIR_ATTEMPTS = 3
     MAX_GENERATION_ATTEMPTS = 3
 
-    def __init__(self, project_path: Path, max_cycles: int, prompts: Dict[str, Any], hooks: ProgressHooks = None):
+    def __init__(self, project_path: Path, max_cycles: int, prompts: Mapping[str, Any], hooks: ProgressHooks = None):
         if not project_path.is_dir():
             raise CoreError(f"Указанный путь не является директорией: {project_path}")
         self.project_path = project_path
         self.max_cycles = max_cycles
         self.hooks = hooks or {}
+        # Колбэки извлекаются из hooks один раз, а не при каждой проверке в циклах
+        self._on_stage = self.hooks.get('on_stage_change')
+        self._on_activity = self.hooks.get('on_file_activity')
+        self._is_cancelled_hook = self.hooks.get('is_cancelled')
+        self._is_cancelled_cb = self._is_cancelled_hook or (lambda: False)
+        self._wait_cancel = self.hooks.get('wait_cancel')
         self.client = GeminiClient()
         self.agents = self._create_agents(prompts)
         self.fs_tools = FileSystemTools(project_root=self.project_path)
         self.initial_context: Optional[str] = None
+        self._have_stash = False
+        # Кэш содержимого файлов: путь -> (st_mtime_ns, st_size, текст)
+        self._file_cache: Dict[Path, Tuple[int, int, str]] = {}
+        # Кэш собранного контекста: (ключ набора файлов, текст)
+        self._context_cache: Optional[Tuple[tuple, str]] = None
 
-    def _create_agents(self, prompts: Dict[str, Any]) -> Dict[str, BaseAgent]:
+    def _create_agents(self, prompts: Mapping[str, Any]) -> Dict[str, BaseAgent]:
         self._report_progress("Инициализация AI-агентов...")
-        if not prompts or not isinstance(prompts, dict):
+        if not prompts or not isinstance(prompts, Mapping):
             raise CoreError("Ошибка конфигурации: промпты не были загружены.")
         
         agents = {}
@@ -62,49 +143,98 @@ class Orchestrator:
 
     def _read_project_context(self, file_paths: Optional[List[Path]] = None) -> str:
         self._report_progress("Анализ контекста проекта...")
-        
+        return self._build_project_context(file_paths)
+
+    def _build_project_context(self, file_paths: Optional[List[Path]] = None) -> str:
+        """Собирает текстовый контекст проекта, используя кэш прочитанных файлов."""
         if file_paths is None:
-            scan_paths = self.project_path.rglob('*.py')
+            # Исключенные директории отсекаются до спуска в них
+            files_to_read = list(_iter_py_files(self.project_path))
         else:
-            scan_paths = file_paths
-
-        files_to_read = [
-            p for p in scan_paths
-            if '.git' not in p.parts and '__pycache__' not in p.parts and 'venv' not in p.parts
-        ]
+            files_to_read = [p for p in file_paths if not _EXCLUDED_PATH_RE.search(str(p))]
 
         if not files_to_read:
             return "В проекте не найдено релевантных файлов для анализа."
         
-        # Здесь может быть более сложная логика построения дерева
-        structure_str = "Структура проекта:\n" + "\n".join(f"- {p.relative_to(self.project_path)}" for p in files_to_read)
-            
-        content_lines = ["\nСодержимое файлов:"]
+        # Стабильный порядок файлов в контексте не зависит от порядка обхода ФС
+        files_to_read.sort()
+
+        # stat() по каждому файлу один раз: и для ключа кэша, и для проверки актуальности
+        file_stats = []
         for path in files_to_read:
-            relative_path = str(path.relative_to(self.project_path)).replace('\\', '/')
-            content_lines.append(f"\n# --- File: {relative_path} ---")
             try:
-                content_lines.append(path.read_text(encoding="utf-8"))
-            except Exception as e:
-                content_lines.append(f"# Ошибка чтения файла: {e}")
-        
-        return structure_str + "\n\n" + "\n".join(content_lines)
+                st = path.stat()
+                file_stats.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                file_stats.append((path, None, None))
+
+        context_key = tuple(file_stats)
+        if self._context_cache is not None and self._context_cache[0] == context_key:
+            return self._context_cache[1]
+
+        texts: Dict[Path, str] = {}
+        to_read = []
+        for path, mtime_ns, size in file_stats:
+            cached = self._file_cache.get(path)
+            if cached is not None and mtime_ns is not None and cached[0] == mtime_ns and cached[1] == size:
+                texts[path] = cached[2]
+            else:
+                to_read.append((path, mtime_ns, size))
+
+        # Читаются только промахи кэша
+        read_results = _read_many([path for path, _, _ in to_read])
+        for (path, mtime_ns, size), (text, error) in zip(to_read, read_results):
+            if error is not None:
+                texts[path] = f"# Ошибка чтения файла: {error}"
+                self._file_cache.pop(path, None)
+                continue
+            texts[path] = text
+            if mtime_ns is not None:
+                self._file_cache[path] = (mtime_ns, size, text)
+
+        # Весь контекст собирается одним join: без промежуточных копий полного размера
+        # Здесь может быть более сложная логика построения дерева
+        # Относительные пути считаются один раз срезом строки, без разбора PurePath
+        root_prefix = str(self.project_path) + os.sep
+        relative_paths = []
+        for path in files_to_read:
+            path_str = str(path)
+            relative_paths.append(
+                path_str[len(root_prefix):] if path_str.startswith(root_prefix) else str(path.relative_to(self.project_path))
+            )
+
+        parts = ["Структура проекта:"]
+        parts.extend(f"- {relative_path}" for relative_path in relative_paths)
+        parts.append("\n\nСодержимое файлов:")
+        for path, relative_path in zip(files_to_read, relative_paths):
+            parts.append(f"\n# --- File: {relative_path.replace(os.sep, '/')} ---")
+            parts.append(texts[path])
+
+        context = "\n".join(parts)
+        self._context_cache = (context_key, context)
+        return context
+
+    def _invalidate_context_cache(self):
+        """Сбрасывает кэш прочитанных файлов после операций Git, меняющих рабочую директорию."""
+        self._file_cache.clear()
+        self._context_cache = None
 
     def _report_progress(self, message: str):
         print(message)
-        if 'on_stage_change' in self.hooks:
-            self.hooks['on_stage_change'](message)
+        if self._on_stage is not None:
+            self._on_stage(message)
 
     def _is_cancelled(self) -> bool:
-        return self.hooks.get('is_cancelled', lambda: False)()
+        return self._is_cancelled_cb()
 
     def _execute_agent_step(self, step_name: str, agent_name: str, context: Any, expected_model: Optional[Type[T]] = None) -> Optional[T]:
         self._report_progress(f"\n{step_name}...")
+        agent = self.agents[agent_name]
         for attempt in range(self.MAX_GENERATION_ATTEMPTS):
             if self._is_cancelled(): return None
             self._report_progress(f"  Попытка {attempt + 1}/{self.MAX_GENERATION_ATTEMPTS}...")
             
-            result = self.agents[agent_name].execute(context, expected_model=expected_model)
+            result = agent.execute(context, expected_model=expected_model)
             
             if result['status'] == 'success':
                 self._report_progress(f"  Шаг '{step_name}' выполнен успешно.")
@@ -136,8 +266,14 @@ class Orchestrator:
             
             self.initial_context = self._read_project_context()
             
-            self.fs_tools.git_stash_create()
-            self._report_progress("Создана точка отката (git stash).")
+            # На чистом дереве stash не нужен (и `stash push -u` зря обходит все файлы):
+            # точкой отката служит HEAD
+            self._have_stash = not self.fs_tools.git_is_clean()
+            if self._have_stash:
+                self.fs_tools.git_stash_create()
+                self._report_progress("Создана точка отката (git stash).")
+            else:
+                self._report_progress("Рабочая директория чистая: точкой отката служит HEAD.")
 
             is_success, commit_title = self.run_full_cycle()
             
@@ -151,10 +287,18 @@ class Orchestrator:
                 else:
                     commit_message = f"refactor: Apply '{commit_title}'"
 
-                self.fs_tools.git_stash_commit(commit_message)
+                if self._have_stash:
+                    self.fs_tools.git_stash_commit(commit_message)
+                else:
+                    self.fs_tools.git_commit_changes(commit_message)
+                self._invalidate_context_cache()
                 self._report_progress(f"Изменения успешно применены и сохранены в коммите.")
             else:
-                self.fs_tools.git_stash_revert()
+                if self._have_stash:
+                    self.fs_tools.git_stash_revert()
+                else:
+                    self.fs_tools.git_discard_changes()
+                self._invalidate_context_cache()
                 self._report_progress("Цикл завершился неудачей. Все изменения отменены.")
                 break
                 
@@ -167,7 +311,7 @@ class Orchestrator:
         ideas = self._execute_agent_step("Шаг 1/3: Генерация идей", 'ideator', self.initial_context, ImprovementIdea)
         if not ideas: return False, ""
         
-        idea_context = json.dumps([i.model_dump() for i in ideas], indent=2, ensure_ascii=False)
+        idea_context = IDEA_ADAPTER.dump_json(ideas, indent=2).decode()
         idea_obj = self._execute_agent_step("Шаг 2/3: Фильтрация идей", 'filter', idea_context, ImprovementIdea)
         if not idea_obj: return False, ""
         self._report_progress(f"  Выбрана идея: '{idea_obj.title}' (Тип: {idea_obj.type})")
@@ -182,44 +326,43 @@ class Orchestrator:
 
     def _run_code_change_pipeline(self, idea_obj: ImprovementIdea) -> bool:
         """Пайплайн для задач, изменяющих код."""
-        plan_obj = self._execute_agent_step("Шаг 3/3: Создание плана", 'planner', idea_obj.model_dump_json(), ImplementationPlan)
+        plan_obj = self._execute_agent_step("Шаг 3/3: Создание плана", 'planner', dump_json_cached(idea_obj), ImplementationPlan)
         if not plan_obj: return False
         if 'on_plan_approved' in self.hooks: self.hooks['on_plan_approved'](plan_obj)
         
-        coder_task = (
-            f"ИДЕЯ: {idea_obj.title} - {idea_obj.description}\n"
-            f"ПЛАН: {plan_obj.description}\n\n"
-            f"Выполни этот план, используя инструменты. Предпочитай `apply_patch`."
+        coder_task = CODER_TASK_TEMPLATE.format_map(
+            {'title': idea_obj.title, 'description': idea_obj.description, 'plan': plan_obj.description}
         )
 
+        coder = self.agents['coder']
+        test_writer = self.agents['test_writer']
+        qa_agent = self.agents['qa_agent']
         for attempt in range(self.MAX_REPAIR_ATTEMPTS):
             if self._is_cancelled(): return False
             self._report_progress(f"\n--- Попытка Разработки и Тестирования #{attempt + 1}/{self.MAX_REPAIR_ATTEMPTS} ---")
 
-            coder_result = self.agents['coder'].execute(coder_task, on_activity=self.hooks.get('on_file_activity'))
+            coder_result = coder.execute(coder_task, on_activity=self._on_activity, wait_cancel=self._wait_cancel)
             if coder_result['status'] != 'success':
-                coder_task = f"Твоя предыдущая попытка провалилась. Ошибка: {coder_result['message']}. Проанализируй ошибку и попробуй еще раз, исправив свой подход."
+                coder_task = CODER_RETRY_TEMPLATE.format_map({'error': coder_result['message']})
                 continue
 
-            test_writer_task = f"Агент-кодер внес изменения: '{coder_result['message']}'. Напиши или обнови pytest тесты."
-            test_writer_result = self.agents['test_writer'].execute(test_writer_task, on_activity=self.hooks.get('on_file_activity'))
+            test_writer_task = TEST_WRITER_TASK_TEMPLATE.format_map({'changes': coder_result['message']})
+            test_writer_result = test_writer.execute(test_writer_task, on_activity=self._on_activity, wait_cancel=self._wait_cancel)
             if test_writer_result['status'] != 'success':
-                coder_task = f"Твои изменения работают, но агент-тестировщик не смог написать для них тесты. Ошибка: {test_writer_result['message']}. Возможно, код нетестируемый? Попробуй исправить."
+                coder_task = TEST_WRITER_FAILED_TEMPLATE.format_map({'error': test_writer_result['message']})
                 continue
 
-            qa_task = "Кодер внес изменения, тестировщик написал тесты. Запусти тесты и вынеси вердикт."
-            qa_result = self.agents['qa_agent'].execute(qa_task, on_activity=self.hooks.get('on_file_activity'))
+            qa_result = qa_agent.execute(
+                QA_TASK, on_activity=self._on_activity, is_cancelled=self._is_cancelled_hook, wait_cancel=self._wait_cancel
+            )
             
-            is_qa_passed = qa_result['status'] == 'success' and ('успех' in qa_result['message'].lower() or 'пройдены' in qa_result['message'].lower())
+            is_qa_passed = qa_result['status'] == 'success' and bool(_QA_OK_RE.search(qa_result['message']))
             if is_qa_passed:
                 return True
             
             current_code_context = self._read_project_context()
-            coder_task = (
-                f"Твоя предыдущая попытка провалила проверку качества. Отчет от QA: '{qa_result['message']}'.\n\n"
-                f"Ты внес следующие изменения: '{coder_result['message']}'.\n\n"
-                f"Вот АКТУАЛЬНОЕ состояние кода:\n{current_code_context}\n\n"
-                f"ИСПРАВЬ ЭТУ ОШИБКУ."
+            coder_task = QA_FAILED_TEMPLATE.format_map(
+                {'report': qa_result['message'], 'changes': coder_result['message'], 'context': current_code_context}
             )
         
         self._report_progress(f"\n--- Не удалось исправить код за {self.MAX_REPAIR_ATTEMPTS} попытки. ---")
@@ -5,10 +5,20 @@
 с файловой системой, средой выполнения (pytest) и системой контроля версий (Git).
 """
 import os
+import shutil
 import sys
 import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Callable, Optional
+from typing import Dict, List, Callable, Optional
+
+MAX_READ_WORKERS = 8 # Максимум потоков для пакетного чтения файлов
+# Служебные директории, которые не показываются агентам и не обходятся при сканировании
+EXCLUDED_DIR_NAMES = frozenset({'.git', '__pycache__', 'venv', '.venv', 'node_modules'})
+MAX_TEST_OUTPUT_LINES = 2000 # Сколько последних строк вывода pytest возвращается агенту
+# На Windows дочерние процессы не должны создавать окно консоли (особенно из GUI)
+SUBPROCESS_CREATIONFLAGS = getattr(subprocess, 'CREATE_NO_WINDOW', 0) if sys.platform == 'win32' else 0
 
 class ToolError(Exception):
     """Специальное исключение для ошибок, возникающих при выполнении инструментов."""
@@ -17,7 +27,8 @@ class ToolError(Exception):
 class FileSystemTools:
     """Набор инструментов для работы с файловой системой проекта и Git."""
 
-    def __init__(self, project_root: Path, on_activity: Optional[Callable[[str], None]] = None):
+    def __init__(self, project_root: Path, on_activity: Optional[Callable[[str], None]] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None):
         """
         Инициализирует инструменты.
 
@@ -25,9 +36,19 @@ class FileSystemTools:
             project_root: Корневая директория проекта, в рамках которой будут работать инструменты.
             on_activity: Опциональный callback, который будет вызываться с путем к файлу
                          при каждой операции чтения/записи.
+            is_cancelled: Опциональный callback, позволяющий прервать долгий запуск тестов.
         """
         self.project_root = project_root.resolve()
+        # Корень и префикс для проверки вложенности путей сравнением строк. normcase приводит
+        # регистр и разделители на Windows, где пути сравниваются без учета регистра.
+        self._root_norm = os.path.normcase(str(self.project_root))
+        self._root_prefix = self._root_norm if self._root_norm.endswith(os.sep) else self._root_norm + os.sep
         self.on_activity = on_activity
+        self.is_cancelled = is_cancelled
+        # Результат проверки `git rev-parse` не меняется за время жизни объекта
+        self._is_repo: Optional[bool] = None
+        # Полный путь к git ищется в PATH один раз; если не найден, ошибка возникнет при вызове
+        self._git_exe = shutil.which('git') or 'git'
 
     def _resolve_path(self, path: str) -> Path:
         """
@@ -38,7 +59,8 @@ class FileSystemTools:
         abs_path = (self.project_root / path).resolve()
         
         # Проверяем, что разрешенный путь находится внутри корневой директории проекта
-        if self.project_root not in abs_path.parents and abs_path != self.project_root:
+        abs_norm = os.path.normcase(str(abs_path))
+        if abs_norm != self._root_norm and not abs_norm.startswith(self._root_prefix):
             raise ToolError(f"Ошибка безопасности: Попытка доступа к файлу вне директории проекта: {path}")
             
         return abs_path
@@ -46,12 +68,14 @@ class FileSystemTools:
     def _run_git_command(self, *args) -> str:
         """Вспомогательный метод для безопасного выполнения команд Git."""
         try:
-            # Проверяем, что мы в Git репозитории
-            check_proc = subprocess.run(['git', 'rev-parse', '--is-inside-work-tree'], cwd=self.project_root, capture_output=True, text=True, check=False)
-            if check_proc.returncode != 0 or "true" not in check_proc.stdout:
+            # Проверяем, что мы в Git репозитории (один раз на экземпляр)
+            if self._is_repo is None:
+                check_proc = subprocess.run([self._git_exe, 'rev-parse', '--is-inside-work-tree'], cwd=self.project_root, capture_output=True, text=True, check=False, creationflags=SUBPROCESS_CREATIONFLAGS)
+                self._is_repo = check_proc.returncode == 0 and "true" in check_proc.stdout
+            if not self._is_repo:
                 raise ToolError("Проект не является Git-репозиторием. Инициализируйте его (`git init`).")
 
-            proc = subprocess.run(['git'] + list(args), cwd=self.project_root, capture_output=True, text=True, check=True, encoding='utf-8')
+            proc = subprocess.run([self._git_exe, *args], cwd=self.project_root, capture_output=True, text=True, check=True, encoding='utf-8', creationflags=SUBPROCESS_CREATIONFLAGS)
             return proc.stdout.strip()
         except FileNotFoundError:
             raise ToolError("Команда 'git' не найдена. Убедитесь, что Git установлен и доступен в PATH.")
@@ -69,12 +93,15 @@ class FileSystemTools:
                 return f"Ошибка: '{path}' не является директорией."
 
             tree_lines = [f"Структура директории '{path}':"]
-            entries = sorted(target_path.iterdir(), key=lambda p: (not p.is_dir(), p.name.lower()))
-            for item in entries:
-                if item.name.startswith('.') or item.name in ['__pycache__', 'venv', '.venv', 'node_modules']:
-                    continue
-                entry = f"{item.name}/" if item.is_dir() else item.name
-                tree_lines.append(f"- {entry}")
+            # DirEntry.is_dir() использует тип, полученный при чтении директории, без лишнего stat()
+            with os.scandir(target_path) as it:
+                entries = [
+                    (item.is_dir(), item.name) for item in it
+                    if not item.name.startswith('.') and item.name not in EXCLUDED_DIR_NAMES
+                ]
+            entries.sort(key=lambda e: (not e[0], e[1].lower()))
+            for is_dir, name in entries:
+                tree_lines.append(f"- {name}/" if is_dir else f"- {name}")
             return "\n".join(tree_lines)
         except Exception as e: return f"Ошибка при листинге файлов: {e}"
 
@@ -87,6 +114,15 @@ class FileSystemTools:
             return file_path.read_text(encoding='utf-8')
         except Exception as e: return f"Ошибка при чтении файла: {e}"
 
+    def read_files(self, paths: List[str]) -> Dict[str, str]:
+        """Читает несколько текстовых файлов за один вызов и возвращает словарь {путь: содержимое}."""
+        unique_paths = list(dict.fromkeys(paths or []))
+        if len(unique_paths) < 2:
+            return {path: self.read_file(path) for path in unique_paths}
+        # Чтение с диска перекрывается между файлами
+        with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(unique_paths))) as executor:
+            return dict(zip(unique_paths, executor.map(self.read_file, unique_paths)))
+
     def write_file(self, path: str, content: str) -> str:
         """Записывает (или перезаписывает) предоставленное содержимое в текстовый файл."""
         if self.on_activity: self.on_activity(path)
@@ -103,11 +139,19 @@ class FileSystemTools:
         try:
             file_path = self._resolve_path(path)
             if not file_path.is_file(): return f"Ошибка: Файл для патча не найден по пути '{path}'."
-            original_content = file_path.read_text(encoding='utf-8')
-            if old_code not in original_content:
+            # Один поиск и склейка срезов в байтах, без декодирования и повторного сканирования файла
+            data = file_path.read_bytes()
+            needle = old_code.encode('utf-8')
+            replacement = new_code.encode('utf-8')
+            idx = data.find(needle)
+            if idx < 0 and b'\r\n' in data:
+                # Файл с окончаниями строк CRLF, а блок от AI приходит с '\n'
+                needle = needle.replace(b'\r\n', b'\n').replace(b'\n', b'\r\n')
+                replacement = replacement.replace(b'\r\n', b'\n').replace(b'\n', b'\r\n')
+                idx = data.find(needle)
+            if idx < 0:
                 return f"Ошибка: Не удалось применить патч. Блок кода для замены не найден в файле '{path}'."
-            updated_content = original_content.replace(old_code, new_code, 1)
-            file_path.write_text(updated_content, encoding='utf-8')
+            file_path.write_bytes(data[:idx] + replacement + data[idx + len(needle):])
             return f"Патч успешно применен к файлу '{path}'."
         except Exception as e: return f"Ошибка при применении патча: {e}"
 
@@ -115,11 +159,30 @@ class FileSystemTools:
         """Запускает pytest для указанной директории или файла и возвращает результат."""
         try:
             target_path = self._resolve_path(test_path)
-            command = [sys.executable, "-m", "pytest", str(target_path)]
-            result = subprocess.run(command, capture_output=True, text=True, cwd=self.project_root)
-            if result.returncode == 0: return f"УСПЕХ: Все тесты пройдены.\n\nВывод:\n{result.stdout}"
-            elif result.returncode == 5: return f"ИНФО: Тесты не найдены по пути '{test_path}'.\n\nВывод:\n{result.stdout}"
-            else: return f"ПРОВАЛ: Тесты не пройдены (код {result.returncode}).\n\nSTDOUT:\n{result.stdout}\nSTDERR:\n{result.stderr}"
+            command = [sys.executable, "-m", "pytest", "-p", "no:cacheprovider", "-q", "--no-header", str(target_path)]
+            # Вывод читается построчно: в памяти остается только хвост, а запуск можно отменить
+            output_tail = deque(maxlen=MAX_TEST_OUTPUT_LINES)
+            total_lines = 0
+            cancelled = False
+            with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                  errors='replace', bufsize=1, cwd=self.project_root,
+                                  creationflags=SUBPROCESS_CREATIONFLAGS) as proc:
+                for line in proc.stdout:
+                    output_tail.append(line)
+                    total_lines += 1
+                    if self.is_cancelled and self.is_cancelled():
+                        cancelled = True
+                        proc.terminate()
+                        break
+                returncode = proc.wait()
+
+            output = "".join(output_tail)
+            if total_lines > MAX_TEST_OUTPUT_LINES:
+                output = f"... (показаны последние {MAX_TEST_OUTPUT_LINES} из {total_lines} строк)\n{output}"
+            if cancelled: return f"ОТМЕНА: Запуск тестов прерван.\n\nВывод:\n{output}"
+            if returncode == 0: return f"УСПЕХ: Все тесты пройдены.\n\nВывод:\n{output}"
+            elif returncode == 5: return f"ИНФО: Тесты не найдены по пути '{test_path}'.\n\nВывод:\n{output}"
+            else: return f"ПРОВАЛ: Тесты не пройдены (код {returncode}).\n\nВывод:\n{output}"
         except FileNotFoundError: return "Ошибка: Команда pytest не найдена. Убедитесь, что pytest установлен."
         except Exception as e: return f"Ошибка при запуске тестов: {e}"
 
@@ -148,9 +211,15 @@ class FileSystemTools:
                 raise  # Перебрасываем другие ошибки Git
             # Если stash не найден, это нормально. Просто очищаем рабочую директорию.
         
-        self._run_git_command('restore', '--staged', '.')
-        self._run_git_command('restore', '.')
-        self._run_git_command('clean', '-fd')
+        return self.git_discard_changes()
+
+    def git_discard_changes(self) -> str:
+        """Отменяет все незакоммиченные изменения, включая новые файлы, возвращаясь к HEAD."""
+        # Индекс и рабочие файлы восстанавливаются одним вызовом. Pathspec '.' ограничивает
+        # обе команды директорией проекта: она может быть частью большего репозитория,
+        # и изменения пользователя вне нее трогать нельзя (в отличие от `reset --hard`).
+        self._run_git_command('restore', '--source=HEAD', '--staged', '--worktree', '--', '.')
+        self._run_git_command('clean', '-fd', '--', '.')
         return "Все изменения, внесенные AI, были успешно отменены."
         
     def git_stash_commit(self, message: str) -> str:
@@ -162,6 +231,10 @@ class FileSystemTools:
                 return "AI не внес фактических изменений в код. Коммит не требуется."
             raise  # Перебрасываем другие ошибки Git
 
+        return self.git_commit_changes(message)
+
+    def git_commit_changes(self, message: str) -> str:
+        """Индексирует все изменения и делает коммит, если они действительно есть."""
         self._run_git_command('add', '.')
         
         # Проверяем, есть ли что-то в индексе для коммита
@@ -13,7 +13,14 @@
 # from evocode_gui import MainWindow
 # вместо
 # from evocode_gui.main_window import MainWindow
-from .main_window import MainWindow
+# Подмодуль (а вместе с ним и PyQt6) загружается только при первом обращении к MainWindow,
+# поэтому простой `import evocode_gui` не тянет за собой GUI-зависимости.
+def __getattr__(name):
+    if name == "MainWindow":
+        from .main_window import MainWindow
+        globals()["MainWindow"] = MainWindow
+        return MainWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # __all__ определяет список публичных объектов этого пакета.
 # Когда кто-то выполнит `from evocode_gui import *`, будет импортирован только MainWindow.
@@ -0,0 +1,26 @@
+# src/evocode_gui/icons.py
+# -*- coding: utf-8 -*-
+"""
+Кэширующие обертки над qtawesome.
+
+Каждый вызов `qta.icon(...)` заново разбирает метаданные шрифта и растеризует глиф,
+поэтому иконки и их растровые изображения создаются один раз на пару (имя, цвет).
+Вызывать только после создания QApplication.
+"""
+from functools import lru_cache
+
+import qtawesome as qta
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QIcon, QPixmap
+
+
+@lru_cache(maxsize=64)
+def cached_icon(name: str, color: str) -> QIcon:
+    """Возвращает иконку qtawesome `name` цвета `color`, создавая ее при первом запросе."""
+    return qta.icon(name, color=color)
+
+
+@lru_cache(maxsize=64)
+def cached_pixmap(name: str, color: str, size: int = 16) -> QPixmap:
+    """Возвращает квадратное растровое изображение иконки размером `size` пикселей."""
+    return cached_icon(name, color).pixmap(QSize(size, size))
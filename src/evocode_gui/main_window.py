@@ -3,18 +3,20 @@
 """
 Определяет главный класс QMainWindow для графического интерфейса EvoCode.
 """
+import re
+from functools import lru_cache
+from collections.abc import Mapping
 from pathlib import Path
 from typing import Dict, Any, Optional
 
 import markdown
-import qtawesome as qta
-from PyQt6.QtCore import QThread, Qt, QSize, QRect, pyqtSlot, QModelIndex
-from PyQt6.QtGui import QMouseEvent, QResizeEvent, QBitmap, QPainter, QColor, QStandardItemModel, QStandardItem, QFontMetrics
+from PyQt6.QtCore import QEvent, QPoint, QThread, Qt, QRect, QRectF, QTimer, pyqtSlot, QModelIndex
+from PyQt6.QtGui import QMouseEvent, QResizeEvent, QPainterPath, QRegion, QColor, QStandardItemModel, QStandardItem, QFontMetrics
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QFileDialog, QMessageBox, QFormLayout,
     QProgressBar, QFrame, QSplitter, QTreeView,
-    QAbstractItemView, QTextEdit, QStyleFactory, QPlainTextEdit
+    QAbstractItemView, QTextEdit, QStyleFactory, QPlainTextEdit, QApplication
 )
 
 from .worker import Worker, ScanTask, EvoTask
@@ -23,11 +25,46 @@ from .styles import MODERN_STYLE_SHEET, PALETTE
 from .title_bar import TitleBar
 from .neural_background import NeuralBackgroundWidget
 from .widgets import ValueSelector, AnimatedButton, CustomMessageBox
+from .icons import cached_icon, cached_pixmap
+
+LOG_MAX_BLOCKS = 5000 # Максимум строк, хранимых в детальном логе
+LOG_FLUSH_INTERVAL_MS = 50 # Как часто накопленные строки лога выводятся в интерфейс
+MOUSE_REPORT_MIN_DISTANCE = 3 # Минимальное смещение курсора (px), передаваемое фону
+WINDOW_CORNER_RADIUS = 12 # Радиус скругления углов окна
+
+# Этапы оркестратора, по которым выставляется прогресс (подстрока сообщения -> процент)
+_PROGRESS_MAP = { "Генерация идей": 10, "Фильтрация": 20, "Создание плана": 30, "Запуск агента-кодера": 45, "Запуск агента-тестировщика": 75, "Запуск QA-агента": 90, "Контроль качества пройден": 100 }
+_PROGRESS_RE = re.compile("|".join(map(re.escape, _PROGRESS_MAP)))
+
+@lru_cache(maxsize=32)
+def _rounded_window_region(width: int, height: int) -> QRegion:
+    """Возвращает маску окна со скругленными углами; при перетаскивании размеры повторяются."""
+    path = QPainterPath()
+    path.addRoundedRect(QRectF(0, 0, width, height), WINDOW_CORNER_RADIUS, WINDOW_CORNER_RADIUS)
+    return QRegion(path.toFillPolygon().toPolygon())
+
+# Заголовок стилей для HTML плана собирается один раз при импорте
+_PLAN_STYLE_PREFIX = f"""
+        <style>
+            body {{ color: {PALETTE['text_secondary']}; font-family: 'Inter', 'Segoe UI'; font-size: 10pt; }}
+            strong {{ color: {PALETTE['text_primary']}; }}
+            code {{ background-color: {PALETTE['bg_widget']}; border-radius: 3px; padding: 2px 4px; }}
+            ul {{ padding-left: 20px; }}
+        </style>
+        """
+
+@lru_cache(maxsize=32)
+def _render_plan_html(description: str) -> str:
+    """Преобразует markdown-описание плана в HTML со стилями; повторные планы берутся из кэша."""
+    return _PLAN_STYLE_PREFIX + markdown.markdown(description)
+
+# Иконки строки статуса: состояние -> (имя иконки qtawesome, ключ цвета в PALETTE)
+_STATUS_ICONS = { "running": ('fa5s.hourglass-half', 'text_muted'), "done": ('fa5s.check-circle', 'accent_success'), "cancelled": ('fa5s.times-circle', 'accent_danger') }
 
 class MainWindow(QMainWindow):
     """Главное окно приложения EvoCode с кастомным дизайном."""
 
-    def __init__(self, prompts: Dict[str, Any]):
+    def __init__(self, prompts: Mapping[str, Any]):
         super().__init__()
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
@@ -38,16 +75,37 @@ class MainWindow(QMainWindow):
         self.scanner_worker: Optional[Worker] = None
         self.project_path: Optional[Path] = None
         self.is_running = False
+        self._path_metrics: Optional[QFontMetrics] = None # Метрики шрифта path_label, сбрасываются при изменении размера
+        self._last_mouse_report = QPoint(-999, -999)
+
+        # Строки лога копятся и выводятся пачкой по таймеру, а не на каждый сигнал;
+        # так же из всех сообщений об активном файле за интервал применяется только последнее
+        self._log_buffer: list[str] = []
+        self._pending_progress: Optional[int] = None
+        self._pending_active_file: Optional[str] = None
+        self._log_flush_timer = QTimer(self)
+        self._log_flush_timer.setSingleShot(True)
+        self._log_flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self._log_flush_timer.timeout.connect(self._flush_log)
 
         self._setup_ui()
         self._create_connections()
+
+        # Растровые иконки статуса готовятся один раз; смена состояния — только замена pixmap
+        self._status_pixmaps = {state: cached_pixmap(name, PALETTE[color]) for state, (name, color) in _STATUS_ICONS.items()}
+        # Иконки дерева файлов: раскрытие и сворачивание папки лишь переключают готовые QIcon
+        self._folder_icon = cached_icon('fa5s.folder', PALETTE['text_muted'])
+        self._folder_open_icon = cached_icon('fa5s.folder-open', PALETTE['text_muted'])
+        self._file_icon = cached_icon('fa5s.file-alt', PALETTE['text_secondary'])
         self.background.start_animation()
 
     def _setup_ui(self):
         self.setWindowTitle("EvoCode AI")
         self.setMinimumSize(1100, 750)
         self.resize(1200, 800)
-        self.setStyleSheet(MODERN_STYLE_SHEET)
+        # Таблица стилей общая для приложения: разбирается один раз и сопоставляется по селекторам
+        app = QApplication.instance()
+        if not app.styleSheet(): app.setStyleSheet(MODERN_STYLE_SHEET)
         
         main_container = QWidget()
         self.setCentralWidget(main_container)
@@ -90,7 +148,7 @@ class MainWindow(QMainWindow):
         layout.addWidget(QLabel("Проект", objectName="SubHeader"))
         self.select_dir_button = AnimatedButton(
             "Выбрать директорию",
-            qta.icon('fa5s.folder-open', color=PALETTE['text_muted'])
+            cached_icon('fa5s.folder-open', PALETTE['text_muted'])
         )
         self.path_label = QLabel("Не выбран")
         self.path_label.setObjectName("PathLabel")
@@ -151,7 +209,7 @@ class MainWindow(QMainWindow):
         line = QFrame()
         line.setFrameShape(QFrame.Shape.HLine)
         line.setFrameShadow(QFrame.Shadow.Sunken)
-        line.setStyleSheet(f"border-color: {PALETTE['border_color']};")
+        line.setObjectName("TaskCardSeparator")
         task_layout.addWidget(line)
         task_layout.addWidget(self.plan_text_edit)
         layout.addWidget(task_card)
@@ -175,6 +233,7 @@ class MainWindow(QMainWindow):
         self.file_tree_model = QStandardItemModel()
         self.file_tree.setModel(self.file_tree_model)
         self.file_tree_path_map = {}
+        self._last_structure: Optional[Dict[str, Any]] = None
         
         file_tree_layout.addWidget(self.file_tree)
         
@@ -187,6 +246,10 @@ class MainWindow(QMainWindow):
         
         self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
+        # Ограничение числа блоков держит стоимость добавления строки постоянной на длинных запусках
+        self.log_output.setMaximumBlockCount(LOG_MAX_BLOCKS)
+        self.log_output.setCenterOnScroll(True)
+        self.log_output.setUndoRedoEnabled(False)
         log_layout.addWidget(self.log_output)
 
         splitter.addWidget(file_tree_container)
@@ -207,19 +270,28 @@ class MainWindow(QMainWindow):
         super().resizeEvent(event)
         self.overlay_widget.setGeometry(self.rect())
         self.background.setGeometry(self.rect())
+        self._path_metrics = None
         
-        mask = QBitmap(self.size())
-        mask.fill(Qt.GlobalColor.white)
-        painter = QPainter(mask)
-        painter.setBrush(Qt.GlobalColor.black)
-        painter.drawRoundedRect(self.rect(), 12, 12)
-        painter.end()
-        self.setMask(mask)
+        self.setMask(_rounded_window_region(self.width(), self.height()))
+
+    def changeEvent(self, event: QEvent):
+        super().changeEvent(event)
+        # Свернутому окну анимация фона не нужна: останавливаем таймер и запускаем при восстановлении
+        if event.type() == QEvent.Type.WindowStateChange and hasattr(self, 'background'):
+            if self.windowState() & Qt.WindowState.WindowMinimized:
+                self.background.stop_animation()
+            else:
+                self.background.start_animation()
 
     def mouseMoveEvent(self, event: QMouseEvent):
         super().mouseMoveEvent(event)
+        # Мелкое дрожание курсора не меняет картинку: фону передаются только заметные смещения
+        pos = event.pos()
+        if (pos - self._last_mouse_report).manhattanLength() < MOUSE_REPORT_MIN_DISTANCE:
+            return
+        self._last_mouse_report = pos
         if hasattr(self, 'background') and self.background:
-            self.background.update_mouse_position(event.pos())
+            self.background.update_mouse_position(pos)
             
     def _create_connections(self):
         self.select_dir_button.clicked.connect(self.select_project_directory)
@@ -230,47 +302,92 @@ class MainWindow(QMainWindow):
         
     def _populate_file_tree(self, structure: Dict[str, Any]):
         """
-        Рекурсивно заполняет QTreeView на основе готовой структуры данных (словаря).
+        Синхронизирует QTreeView с готовой структурой данных (словарем).
+
+        Дерево не пересоздается: новая структура сравнивается с предыдущей и в модель
+        вносятся только добавленные и удаленные узлы, поэтому повторное сканирование
+        того же проекта почти ничего не стоит и сохраняет раскрытые папки.
         """
-        self.file_tree_model.clear()
-        self.file_tree_path_map.clear()
-        
-        def add_items(parent_item, data_dict, current_path):
-            # ИСПРАВЛЕНИЕ: Итерируемся по словарю, а не по пути
-            sorted_items = sorted(data_dict.items(), key=lambda x: (not isinstance(x[1], dict), x[0].lower()))
-            
-            for name, content in sorted_items:
-                item = QStandardItem(name)
-                item.setEditable(False)
-                
-                new_path = f"{current_path}/{name}" if current_path else name
-                self.file_tree_path_map[new_path] = item
-                
-                if isinstance(content, dict):
-                    item.setIcon(qta.icon('fa5s.folder', color=PALETTE['text_muted']))
-                    parent_item.appendRow(item)
-                    add_items(item, content, new_path)
-                else:
-                    item.setIcon(qta.icon('fa5s.file-alt', color=PALETTE['text_secondary']))
-                    parent_item.appendRow(item)
-        
+        if structure == self._last_structure:
+            return
+        old_structure = self._last_structure or {}
+        self._last_structure = structure
+
         root_item = self.file_tree_model.invisibleRootItem()
-        add_items(root_item, structure, "")
-        self.file_tree.expandToDepth(0)
+        self._sync_tree_items(root_item, structure, old_structure, "")
+        if not old_structure:
+            self.file_tree.expandToDepth(0)
+            return
+        # При обновлении раскрываются только новые папки верхнего уровня, а не вся модель
+        for name, content in structure.items():
+            if isinstance(content, dict) and not isinstance(old_structure.get(name), dict):
+                self.file_tree.expand(self.file_tree_model.indexFromItem(self.file_tree_path_map[name]))
+
+    @staticmethod
+    def _sort_tree_entries(data_dict: Dict[str, Any]):
+        # Папки выше файлов, внутри групп — по имени без учета регистра; точное имя
+        # делает порядок однозначным, чтобы он совпадал между сканированиями.
+        return sorted(data_dict.items(), key=lambda x: (not isinstance(x[1], dict), x[0].lower(), x[0]))
+
+    def _sync_tree_items(self, parent_item: QStandardItem, new_dict: Dict[str, Any],
+                         old_dict: Dict[str, Any], current_path: str):
+        """Приводит дочерние элементы `parent_item` от `old_dict` к `new_dict`."""
+        # Удаляем исчезнувшие узлы и узлы, сменившие тип (файл <-> папка).
+        for name, old_content in old_dict.items():
+            if name in new_dict and isinstance(new_dict[name], dict) == isinstance(old_content, dict):
+                continue
+            path = f"{current_path}/{name}" if current_path else name
+            item = self.file_tree_path_map.get(path)
+            if item is not None:
+                parent_item.removeRow(item.row())
+            self._forget_tree_paths(path, old_content)
+
+        # Оставшиеся строки уже идут в порядке сортировки — вставляем новые на свои места.
+        for row, (name, content) in enumerate(self._sort_tree_entries(new_dict)):
+            path = f"{current_path}/{name}" if current_path else name
+            is_dir = isinstance(content, dict)
+            if name in old_dict and isinstance(old_dict[name], dict) == is_dir:
+                old_content = old_dict[name]
+                if is_dir and content != old_content:
+                    self._sync_tree_items(self.file_tree_path_map[path], content, old_content, path)
+                continue
+
+            item = QStandardItem(name)
+            item.setEditable(False)
+            self.file_tree_path_map[path] = item
+            if is_dir:
+                item.setIcon(self._folder_icon)
+                parent_item.insertRow(row, item)
+                self._sync_tree_items(item, content, {}, path)
+            else:
+                item.setIcon(self._file_icon)
+                parent_item.insertRow(row, item)
+
+    def _forget_tree_paths(self, path: str, content: Any):
+        """Удаляет из `file_tree_path_map` путь `path` и все вложенные в него пути."""
+        self.file_tree_path_map.pop(path, None)
+        if isinstance(content, dict):
+            for name, child in content.items():
+                self._forget_tree_paths(f"{path}/{name}", child)
 
     @pyqtSlot(QModelIndex)
     def _on_item_expanded(self, index: QModelIndex):
         item = self.file_tree_model.itemFromIndex(index)
         if item:
-            item.setIcon(qta.icon('fa5s.folder-open', color=PALETTE['text_muted']))
+            item.setIcon(self._folder_open_icon)
 
     @pyqtSlot(QModelIndex)
     def _on_item_collapsed(self, index: QModelIndex):
         item = self.file_tree_model.itemFromIndex(index)
         if item:
-            item.setIcon(qta.icon('fa5s.folder', color=PALETTE['text_muted']))
+            item.setIcon(self._folder_icon)
 
     @pyqtSlot(str)
+    def _queue_active_file(self, file_path_str: str):
+        self._pending_active_file = file_path_str
+        if not self._log_flush_timer.isActive():
+            self._log_flush_timer.start()
+
     def _highlight_active_file(self, file_path_str: str):
         if file_path_str in self.file_tree_path_map:
             item = self.file_tree_path_map[file_path_str]
@@ -286,31 +403,25 @@ class MainWindow(QMainWindow):
             self.path_label.setText("Сканирование...")
             self.path_label.setToolTip(str(self.project_path))
             
-            self.thread = QThread()
             scan_task = ScanTask(self.project_path)
             self.scanner_worker = Worker(scan_task)
-            self.scanner_worker.moveToThread(self.thread)
-            
             self.scanner_worker.scan_finished.connect(self._on_scan_finished)
             self.scanner_worker.error.connect(self.on_processing_error)
-            
-            self.thread.started.connect(self.scanner_worker.run)
-            self.thread.start()
+            self.thread = self._start_worker_thread(self.scanner_worker)
 
     @pyqtSlot(dict)
     def _on_scan_finished(self, structure: Dict[str, Any]):
         if not self.project_path: return
 
         full_path_str = str(self.project_path)
-        metrics = QFontMetrics(self.path_label.font())
-        elided_text = metrics.elidedText(full_path_str, Qt.TextElideMode.ElideMiddle, self.path_label.width())
-        self.path_label.setText(elided_text)
+        if self._path_metrics is None:
+            self._path_metrics = QFontMetrics(self.path_label.font())
+        width = self.path_label.width()
+        if self._path_metrics.horizontalAdvance(full_path_str) > width:
+            full_path_str = self._path_metrics.elidedText(full_path_str, Qt.TextElideMode.ElideMiddle, width)
+        self.path_label.setText(full_path_str)
         
         self._populate_file_tree(structure)
-        
-        if self.thread and self.thread.isRunning():
-            self.thread.quit()
-            self.thread.wait()
 
     def run_evolution(self):
         """Запускает процесс эволюции в отдельном потоке."""
@@ -319,9 +430,10 @@ class MainWindow(QMainWindow):
 
         self._set_ui_enabled(False)
         self._clear_task_info()
+        self._flush_log()
         self.log_output.clear()
         self.progress_bar.setValue(0)
-        self.status_icon.setPixmap(qta.icon('fa5s.hourglass-half', color=PALETTE['text_muted']).pixmap(QSize(16, 16)))
+        self.status_icon.setPixmap(self._status_pixmaps["running"])
 
         project_path = Path.cwd()
         num_cycles = self.cycles_selector.value()
@@ -334,19 +446,40 @@ class MainWindow(QMainWindow):
             prompts=self.prompts
         )
 
-        self.thread = QThread()
         self.worker = Worker(task)
-        self.worker.moveToThread(self.thread)
-        
         self.worker.finished.connect(self.on_processing_finished)
         self.worker.error.connect(self.on_processing_error)
         self.worker.stage_changed.connect(self.update_log_and_status)
         self.worker.idea_approved.connect(self.display_idea)
         self.worker.plan_approved.connect(self.display_plan)
-        self.worker.file_activity_changed.connect(self._highlight_active_file)
-        
-        self.thread.started.connect(self.worker.run)
-        self.thread.start()
+        self.worker.file_activity_changed.connect(self._queue_active_file)
+        self.thread = self._start_worker_thread(self.worker)
+
+    def _start_worker_thread(self, worker: Worker) -> QThread:
+        """
+        Запускает `worker` в новом QThread без блокирующего ожидания при завершении.
+
+        Поток останавливается по сигналу `finished` рабочего, после чего Qt сам удаляет
+        поток и рабочего, а окно отпускает ссылки на них.
+        """
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(lambda: self._release_worker_thread(thread, worker))
+        thread.start()
+        return thread
+
+    def _release_worker_thread(self, thread: QThread, worker: Worker):
+        """Сбрасывает ссылки на завершившийся поток, если они еще указывают на него."""
+        if self.thread is thread:
+            self.thread = None
+        if self.worker is worker:
+            self.worker = None
+        if self.scanner_worker is worker:
+            self.scanner_worker = None
 
     def cancel_processing(self):
         if self.worker:
@@ -355,22 +488,17 @@ class MainWindow(QMainWindow):
             self.worker.cancel()
 
     def on_processing_finished(self):
+        self._flush_log()
         status_msg = "Операция отменена" if self.worker and self.worker._is_cancelled else "Готово"
         self.status_label.setText(status_msg)
         if status_msg == "Готово":
-            self.status_icon.setPixmap(qta.icon('fa5s.check-circle', color=PALETTE['accent_success']).pixmap(QSize(16, 16)))
+            self.status_icon.setPixmap(self._status_pixmaps["done"])
             if self.progress_bar.value() > 0: self.progress_bar.setValue(100)
         else:
-             self.status_icon.setPixmap(qta.icon('fa5s.times-circle', color=PALETTE['accent_danger']).pixmap(QSize(16, 16)))
+             self.status_icon.setPixmap(self._status_pixmaps["cancelled"])
         
         self.is_running = False
         self._set_ui_enabled(True)
-        
-        if self.thread and self.thread.isRunning():
-            self.thread.quit()
-            self.thread.wait()
-        self.thread = None
-        self.worker = None
 
     def on_processing_error(self, title: str, message: str):
         msg_box = CustomMessageBox(title, message, 'fa5s.bomb', PALETTE['accent_danger'], parent=self)
@@ -380,13 +508,25 @@ class MainWindow(QMainWindow):
     def update_log_and_status(self, text: str):
         clean_text = text.strip()
         if not clean_text: return
-        self.log_output.appendPlainText(clean_text)
-        self.status_label.setText(clean_text)
-        progress_map = { "Генерация идей": 10, "Фильтрация": 20, "Создание плана": 30, "Запуск агента-кодера": 45, "Запуск агента-тестировщика": 75, "Запуск QA-агента": 90, "Контроль качества пройден": 100 }
-        for key, value in progress_map.items():
-            if key in clean_text:
-                self.progress_bar.setValue(value)
-                break
+        self._log_buffer.append(clean_text)
+        if match := _PROGRESS_RE.search(clean_text):
+            self._pending_progress = _PROGRESS_MAP[match.group(0)]
+        if not self._log_flush_timer.isActive():
+            self._log_flush_timer.start()
+
+    def _flush_log(self):
+        """Выводит накопленные строки лога, последний статус, прогресс и активный файл за одно обновление."""
+        self._log_flush_timer.stop()
+        if self._log_buffer:
+            self.log_output.appendPlainText("\n".join(self._log_buffer))
+            self.status_label.setText(self._log_buffer[-1])
+            self._log_buffer.clear()
+        if self._pending_progress is not None:
+            self.progress_bar.setValue(self._pending_progress)
+            self._pending_progress = None
+        if self._pending_active_file is not None:
+            self._highlight_active_file(self._pending_active_file)
+            self._pending_active_file = None
 
     def display_idea(self, idea: ImprovementIdea):
         clean_title = idea.title.replace("`", "").replace("*", "")
@@ -394,17 +534,7 @@ class MainWindow(QMainWindow):
         self.idea_title_label.setToolTip(f"Приоритет: {idea.priority}\nОписание: {idea.description}")
 
     def display_plan(self, plan: ImplementationPlan):
-        html_plan = markdown.markdown(plan.description)
-        styled_html = f"""
-        <style>
-            body {{ color: {PALETTE['text_secondary']}; font-family: 'Inter', 'Segoe UI'; font-size: 10pt; }}
-            strong {{ color: {PALETTE['text_primary']}; }}
-            code {{ background-color: {PALETTE['bg_widget']}; border-radius: 3px; padding: 2px 4px; }}
-            ul {{ padding-left: 20px; }}
-        </style>
-        {html_plan}
-        """
-        self.plan_text_edit.setHtml(styled_html)
+        self.plan_text_edit.setHtml(_render_plan_html(plan.description))
         
     def _clear_task_info(self):
         self.idea_title_label.setText("Ожидание новой идеи...")
@@ -417,13 +547,17 @@ class MainWindow(QMainWindow):
         self.cancel_button.setEnabled(not enabled)
 
     def closeEvent(self, event):
+        self._log_flush_timer.stop()
         if hasattr(self, 'background'):
             self.background.stop_animation()
         if self.thread and self.thread.isRunning():
             self.cancel_processing()
             self.thread.quit()
+            # Ждем без ограничения: поток принадлежит окну и не должен уничтожаться работающим.
+            # Отмена прерывает ожидание повторов, поэтому остается дождаться лишь текущего вызова.
             self.thread.wait()
         event.accept()
 
     def log_message(self, message: str, color: str):
+        self._flush_log()
         self.log_output.appendHtml(f'<span style="color: {color};">{message}</span>')
\ No newline at end of file
@@ -1,22 +1,50 @@
 # src/evocode_gui/neural_background.py
 # Ваш код для NeuralBackgroundWidget сюда...
 # Я скопирую его полностью, чтобы быть уверенным в результате.
-import math
-import random
 import sys
-from typing import List, Dict, Any, Optional
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+
+try:
+    from . import neural_background_numba as _numba_kernels
+except ImportError:
+    # numba опционален: без него физика и поиск связей считаются векторно на NumPy
+    _numba_kernels = None
 
 from PyQt6.QtWidgets import QWidget, QPushButton, QApplication, QMainWindow
 from PyQt6.QtGui import (
     QPainter, QColor, QPen, QBrush, QPaintEvent, QResizeEvent, QShowEvent,
     QMouseEvent, QPainterPath
 )
-from PyQt6.QtCore import QTimer, QPointF, Qt, QRect, QRectF, pyqtSignal, QObject, QPropertyAnimation, QEasingCurve, QSequentialAnimationGroup, QPoint
+from PyQt6.QtCore import QTimer, QPointF, Qt, QLine, QRect, QRectF, pyqtSignal, QObject, QPropertyAnimation, QEasingCurve, QSequentialAnimationGroup, QPoint
+
+class _ParticleArrays:
+    """
+    Состояние всех частиц в виде структуры массивов (SoA): физика шага
+    считается векторно по массивам, без Python-объекта на каждую частицу.
+    """
+    __slots__ = ('pos', 'vel', 'size', 'mass')
+    def __init__(self, pos: np.ndarray, vel: np.ndarray, size: np.ndarray, mass: np.ndarray):
+        self.pos, self.vel, self.size, self.mass = pos, vel, size, mass  # (N,2), (N,2), (N,), (N,) float32
+
+    @classmethod
+    def random(cls, count: int, width: float, height: float, base_speed: float) -> "_ParticleArrays":
+        pos = np.empty((count, 2), dtype=np.float32)
+        pos[:, 0] = np.random.uniform(0, width, count)
+        pos[:, 1] = np.random.uniform(0, height, count)
+        vel = np.random.uniform(-base_speed, base_speed, (count, 2)).astype(np.float32)
+        size = np.random.uniform(1.5, 3.5, count).astype(np.float32)
+        return cls(pos, vel, size, size * size)
+
+    def __len__(self) -> int: return len(self.size)
 
-class Particle:
-    __slots__ = ('pos', 'vel', 'size', 'parallax_factor', 'mass')
-    def __init__(self, pos: QPointF, vel: QPointF, size: float, parallax_factor: float, mass: float):
-        self.pos, self.vel, self.size, self.parallax_factor, self.mass = pos, vel, size, parallax_factor, mass
+@lru_cache(maxsize=4)
+def _pair_indices(count: int):
+    """Индексы всех пар (i < j) для count частиц; строятся один раз на размер."""
+    return np.triu_indices(count, k=1)
 
 class NeuralBackgroundWidget(QWidget):
     PARTICLE_COUNT: int = 80
@@ -28,67 +56,127 @@ class NeuralBackgroundWidget(QWidget):
     BG_COLOR = QColor(32, 34, 37)
     PARTICLE_COLOR = QColor(80, 85, 97, 150)
     LINE_BASE_COLOR = QColor(80, 85, 97)
+    FRAME_INTERVAL_MS: int = 33
+    # Без движения мыши кадры рисуются вдвое реже, а физика шагает дважды за кадр
+    IDLE_FRAME_INTERVAL_MS: int = 66
+    IDLE_AFTER_S: float = 1.0
 
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
-        self.particles: List[Particle] = []
+        self.particles: Optional[_ParticleArrays] = None
         self.mouse_pos = QPointF(-1, -1)
+        self._last_interaction = time.monotonic()
         self.animation_timer = QTimer(self)
         self.animation_timer.timeout.connect(self.update_particles)
         self.setMouseTracking(True)
         self.is_animation_running = False
+        # Буферы (i, j, alpha) для Numba-ядра поиска связей, по одному набору на число частиц
+        self._connection_buffers: Optional[tuple] = None
+        # Перья для линий связей, по одному на каждое значение прозрачности 0..100
+        base = self.LINE_BASE_COLOR
+        self._pen_cache = [QPen(QColor(base.red(), base.green(), base.blue(), alpha), 1) for alpha in range(101)]
+        # Круглые перья для частиц: диаметр в пикселях -> перо, рисующее точку этим диаметром
+        self._particle_pens: Dict[int, QPen] = {}
+        if _numba_kernels is not None: _numba_kernels.warm_up()
 
-    def _rand_float(self, min_val: float, max_val: float) -> float: return random.uniform(min_val, max_val)
-    def _create_particle(self) -> Particle:
-        size = self._rand_float(1.5, 3.5)
-        return Particle(QPointF(self._rand_float(0, self.width()), self._rand_float(0, self.height())), QPointF(self._rand_float(-self.BASE_SPEED, self.BASE_SPEED), self._rand_float(-self.BASE_SPEED, self.BASE_SPEED)), size, self._rand_float(0.1, 0.5), size*size)
     def init_particles(self):
         if not self.isVisible() or self.width() == 0: return
-        self.particles = [self._create_particle() for _ in range(self.PARTICLE_COUNT)]
+        self.particles = _ParticleArrays.random(self.PARTICLE_COUNT, self.width(), self.height(), self.BASE_SPEED)
         if self.mouse_pos.x() < 0: self.mouse_pos = QPointF(self.width() / 2, self.height() / 2)
         self.update()
     def update_particles(self):
         if not self.is_animation_running: return
-        w, h = self.width(), self.height()
-        for p in self.particles:
-            p.pos += p.vel
-            if p.pos.x() < 0 or p.pos.x() > w: p.vel.setX(-p.vel.x())
-            if p.pos.y() < 0 or p.pos.y() > h: p.vel.setY(-p.vel.y())
-            if self.mouse_pos.x() > 0:
-                vec_from_mouse = p.pos - self.mouse_pos
-                dist_sq = vec_from_mouse.x()**2 + vec_from_mouse.y()**2
-                if dist_sq < self.REPULSION_RADIUS**2 and dist_sq > 1e-6:
-                    dist = math.sqrt(dist_sq)
-                    force = (1 - dist / self.REPULSION_RADIUS) * self.REPULSION_STRENGTH
-                    p.pos += (vec_from_mouse / dist) * force
+        # Кадры, которые никто не увидит, не считаются и не рисуются
+        if not self.isVisible() or self.window().windowState() & Qt.WindowState.WindowMinimized: return
+        idle = time.monotonic() - self._last_interaction > self.IDLE_AFTER_S
+        interval = self.IDLE_FRAME_INTERVAL_MS if idle else self.FRAME_INTERVAL_MS
+        if self.animation_timer.interval() != interval: self.animation_timer.setInterval(interval)
+        if self.particles is not None:
+            # Число шагов физики пропорционально интервалу, поэтому скорость частиц не меняется
+            for _ in range(interval // self.FRAME_INTERVAL_MS): self._step_physics()
         self.update()
+    def _step_physics(self):
+        pos, vel = self.particles.pos, self.particles.vel
+        w, h = self.width(), self.height()
+        use_mouse = self.mouse_pos.x() > 0
+        if _numba_kernels is not None:
+            _numba_kernels.step(pos, vel, float(w), float(h), self.mouse_pos.x(), self.mouse_pos.y(), use_mouse,
+                                self.REPULSION_RADIUS, self.REPULSION_STRENGTH)
+            return
+        pos += vel
+        # Отражение от границ: разворачиваем соответствующую компоненту скорости
+        vel[(pos[:, 0] < 0) | (pos[:, 0] > w), 0] *= -1
+        vel[(pos[:, 1] < 0) | (pos[:, 1] > h), 1] *= -1
+        if use_mouse:
+            delta = pos - np.array([self.mouse_pos.x(), self.mouse_pos.y()], dtype=np.float32)
+            dist_sq = np.einsum('ij,ij->i', delta, delta)
+            near = (dist_sq < self.REPULSION_RADIUS**2) & (dist_sq > 1e-6)
+            if near.any():
+                dist = np.sqrt(dist_sq[near])
+                force = (1 - dist / self.REPULSION_RADIUS) * self.REPULSION_STRENGTH
+                pos[near] += delta[near] * (force / dist)[:, None]
+    def _visible_connections(self):
+        """Возвращает (alphas, pair_i, pair_j) для пар частиц ближе CONNECTION_DISTANCE."""
+        pos = self.particles.pos
+        connection_dist_sq = self.CONNECTION_DISTANCE**2
+        if _numba_kernels is not None:
+            max_pairs = len(pos) * (len(pos) - 1) // 2
+            if self._connection_buffers is None or len(self._connection_buffers[0]) != max_pairs:
+                self._connection_buffers = tuple(np.empty(max_pairs, dtype=np.int32) for _ in range(3))
+            out_i, out_j, out_alpha = self._connection_buffers
+            count = _numba_kernels.connections(pos, connection_dist_sq, out_i, out_j, out_alpha)
+            return out_alpha[:count], out_i[:count], out_j[:count]
+        # Дистанции всех пар считаются одним векторным проходом; в Python-цикл
+        # попадают только пары ближе CONNECTION_DISTANCE
+        pair_i, pair_j = _pair_indices(len(pos))
+        delta = pos[pair_i] - pos[pair_j]
+        dist_sq = np.einsum('ij,ij->i', delta, delta)
+        close = dist_sq < connection_dist_sq
+        alphas = (100 * (1 - dist_sq[close] / connection_dist_sq)).astype(np.int32)
+        visible = alphas > 0
+        return alphas[visible], pair_i[close][visible], pair_j[close][visible]
     def start_animation(self):
-        if not self.is_animation_running: self.is_animation_running = True; self.animation_timer.start(33)
+        if not self.is_animation_running: self.is_animation_running = True; self.animation_timer.start(self.FRAME_INTERVAL_MS)
     def stop_animation(self):
         if self.is_animation_running: self.is_animation_running = False; self.animation_timer.stop()
     def paintEvent(self, event: QPaintEvent):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         painter.fillRect(self.rect(), self.BG_COLOR)
-        if not self.particles: return
-        for i in range(len(self.particles)):
-            for j in range(i + 1, len(self.particles)):
-                p1, p2 = self.particles[i], self.particles[j]
-                dist_sq = (p1.pos.x() - p2.pos.x())**2 + (p1.pos.y() - p2.pos.y())**2
-                if dist_sq < self.CONNECTION_DISTANCE**2:
-                    alpha = int(100 * (1 - dist_sq / self.CONNECTION_DISTANCE**2))
-                    if alpha > 0:
-                        pen_color = QColor(self.LINE_BASE_COLOR)
-                        pen_color.setAlpha(alpha)
-                        painter.setPen(QPen(pen_color, 1))
-                        painter.drawLine(p1.pos, p2.pos)
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.setBrush(self.PARTICLE_COLOR)
-        for p in self.particles: painter.drawEllipse(p.pos, p.size, p.size)
+        if self.particles is None: return
+        pos = self.particles.pos
+        alphas, pair_i, pair_j = self._visible_connections()
+        if len(alphas):
+            # Тонкие полупрозрачные линии рисуются без сглаживания по целым координатам;
+            # линии одной прозрачности выводятся одним вызовом drawLines со своим пером
+            order = np.argsort(alphas, kind='stable')
+            alphas = alphas[order]
+            int_pos = pos.astype(np.int32)
+            lines = [QLine(*ends) for ends in np.concatenate((int_pos[pair_i[order]], int_pos[pair_j[order]]), axis=1).tolist()]
+            bounds = (np.flatnonzero(np.diff(alphas)) + 1).tolist()
+            group_alphas = alphas[[0] + bounds].tolist()
+            for alpha, start, stop in zip(group_alphas, [0] + bounds, bounds + [len(lines)]):
+                painter.setPen(self._pen_cache[alpha])
+                painter.drawLines(lines[start:stop])
+        # Частицы — это точки круглым пером; размеры округляются до целого диаметра,
+        # и частицы одного диаметра рисуются одним вызовом drawPoints
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        diameters = np.rint(self.particles.size * 2).astype(np.int32)
+        for diameter in np.unique(diameters).tolist():
+            painter.setPen(self._particle_pen(diameter))
+            painter.drawPoints([QPointF(x, y) for x, y in pos[diameters == diameter].tolist()])
+    def _particle_pen(self, diameter: int) -> QPen:
+        pen = self._particle_pens.get(diameter)
+        if pen is None:
+            pen = self._particle_pens[diameter] = QPen(self.PARTICLE_COLOR, diameter, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap)
+        return pen
     def resizeEvent(self, event: QResizeEvent): self.init_particles()
     def showEvent(self, event: QShowEvent):
         super().showEvent(event)
         self.init_particles()
-        if self.is_animation_running and not self.animation_timer.isActive(): self.animation_timer.start(33)
+        if self.is_animation_running and not self.animation_timer.isActive(): self.animation_timer.start(self.FRAME_INTERVAL_MS)
     def hideEvent(self, event): super().hideEvent(event); self.animation_timer.stop()
-    def update_mouse_position(self, pos: QPoint): self.mouse_pos = QPointF(pos)
\ No newline at end of file
+    def update_mouse_position(self, pos: QPoint):
+        self.mouse_pos = QPointF(pos)
+        self._last_interaction = time.monotonic()
+        if self.animation_timer.isActive() and self.animation_timer.interval() != self.FRAME_INTERVAL_MS:
+            self.animation_timer.setInterval(self.FRAME_INTERVAL_MS)
\ No newline at end of file
@@ -0,0 +1,69 @@
+# src/evocode_gui/neural_background_numba.py
+# -*- coding: utf-8 -*-
+"""
+Скомпилированные Numba-ядра для NeuralBackgroundWidget.
+
+Модуль импортируется только при наличии numba; иначе виджет использует
+векторизованный путь на NumPy. Ядра работают с теми же float32-массивами
+(структура массивов), что и основной виджет, и не создают временных массивов.
+"""
+import math
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def step(pos, vel, width, height, mouse_x, mouse_y, use_mouse, radius, strength):
+    """Один шаг физики: движение, отражение от границ и отталкивание от курсора (на месте)."""
+    radius_sq = radius * radius
+    for k in range(pos.shape[0]):
+        pos[k, 0] += vel[k, 0]
+        pos[k, 1] += vel[k, 1]
+        if pos[k, 0] < 0 or pos[k, 0] > width: vel[k, 0] = -vel[k, 0]
+        if pos[k, 1] < 0 or pos[k, 1] > height: vel[k, 1] = -vel[k, 1]
+        if use_mouse:
+            dx = pos[k, 0] - mouse_x
+            dy = pos[k, 1] - mouse_y
+            dist_sq = dx * dx + dy * dy
+            if dist_sq < radius_sq and dist_sq > 1e-6:
+                dist = math.sqrt(dist_sq)
+                force = (1 - dist / radius) * strength
+                pos[k, 0] += dx / dist * force
+                pos[k, 1] += dy / dist * force
+
+
+@njit(cache=True, fastmath=True)
+def connections(pos, connection_dist_sq, out_i, out_j, out_alpha):
+    """
+    Заполняет предвыделенные буферы парами (i, j) ближе порога и их прозрачностью.
+
+    Returns:
+        int: Количество найденных пар (заполненная длина буферов).
+    """
+    count = 0
+    n = pos.shape[0]
+    for i in range(n):
+        for j in range(i + 1, n):
+            dx = pos[i, 0] - pos[j, 0]
+            dy = pos[i, 1] - pos[j, 1]
+            dist_sq = dx * dx + dy * dy
+            if dist_sq < connection_dist_sq:
+                alpha = int(100 * (1 - dist_sq / connection_dist_sq))
+                if alpha > 0:
+                    out_i[count] = i
+                    out_j[count] = j
+                    out_alpha[count] = alpha
+                    count += 1
+    return count
+
+
+def warm_up():
+    """Компилирует ядра на фиктивных данных, чтобы первый кадр анимации не подвисал."""
+    pos = np.zeros((2, 2), dtype=np.float32)
+    vel = np.zeros((2, 2), dtype=np.float32)
+    step(pos, vel, 1.0, 1.0, 0.0, 0.0, False, 1.0, 1.0)
+    out_i = np.empty(1, dtype=np.int32)
+    out_j = np.empty(1, dtype=np.int32)
+    out_alpha = np.empty(1, dtype=np.int32)
+    connections(pos, 1.0, out_i, out_j, out_alpha)
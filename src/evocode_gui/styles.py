@@ -44,6 +44,11 @@ MODERN_STYLE_SHEET = f"""
     #TitleBar {{
         background-color: transparent;
     }}
+    QLabel#TitleBarLabel {{
+        color: {PALETTE['text_secondary']};
+        padding-left: 15px;
+        font-weight: 500;
+    }}
 
     /* --- ПАНЕЛИ --- */
     #Sidebar {{
@@ -78,6 +83,18 @@ MODERN_STYLE_SHEET = f"""
     }}
     
     /* --- КНОПКИ --- */
+    AnimatedButton {{
+        background-color: transparent;
+        border: 1px solid {PALETTE['border_color']};
+        text-align: center;
+        padding: 10px;
+        border-radius: 5px;
+        font-weight: 500;
+    }}
+    AnimatedButton:hover {{
+        background-color: {PALETTE['glass_border']};
+        border-color: {PALETTE['text_muted']};
+    }}
     QPushButton#RunButton {{
         background-color: {PALETTE['accent_success']};
         color: white;
@@ -148,6 +165,9 @@ MODERN_STYLE_SHEET = f"""
         font-weight: 500;
         color: {PALETTE['text_primary']};
     }}
+    #TaskCardSeparator {{
+        border-color: {PALETTE['border_color']};
+    }}
     #PlanTextEdit {{
         background-color: transparent;
         border: none;
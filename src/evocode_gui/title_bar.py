@@ -4,8 +4,16 @@
 обеспечивающий перемещение безрамочного окна и кастомные кнопки управления.
 """
 from PyQt6.QtWidgets import QWidget, QHBoxLayout, QLabel, QApplication
-from PyQt6.QtCore import Qt, QPointF, pyqtSignal
-from PyQt6.QtGui import QPainter, QColor, QPen
+from PyQt6.QtCore import Qt, QPointF, QTimer, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QPen, QPixmap, QPixmapCache
+
+DRAG_MOVE_INTERVAL_MS = 16 # Не чаще одного перемещения окна за кадр (~60 FPS) при перетаскивании
+
+def _symbol_pen(color: QColor, width: float) -> QPen:
+    pen = QPen(color)
+    pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+    pen.setWidthF(width)
+    return pen
 
 class TitleBarButton(QWidget):
     """Кастомная кнопка для TitleBar."""
@@ -16,6 +24,15 @@ class TitleBarButton(QWidget):
     _HOVER_BG_COLOR = QColor(71, 75, 82)
     _HOVER_SYMBOL_COLOR = QColor(224, 226, 228)
     _DANGER_HOVER_BG_COLOR = QColor(237, 66, 69, 150)
+    # Готовые перья символов: (наведение, символ) -> перо нужного цвета и толщины
+    _SYMBOL_PENS = {
+        (False, "□"): _symbol_pen(_SYMBOL_COLOR, 1.2),
+        (True, "□"): _symbol_pen(_HOVER_SYMBOL_COLOR, 1.2),
+        (False, "—"): _symbol_pen(_SYMBOL_COLOR, 1.5),
+        (True, "—"): _symbol_pen(_HOVER_SYMBOL_COLOR, 1.5),
+        (False, "✕"): _symbol_pen(_SYMBOL_COLOR, 1.5),
+        (True, "✕"): _symbol_pen(_HOVER_SYMBOL_COLOR, 1.5),
+    }
 
     def __init__(self, symbol: str, is_danger: bool = False, parent=None):
         super().__init__(parent)
@@ -24,44 +41,64 @@ class TitleBarButton(QWidget):
         self.setFixedSize(46, 32)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
         self.is_hovered = False
+        # Наведенная обычная кнопка целиком заливается непрозрачным фоном: на это время Qt
+        # может не перерисовывать под ней родителя. В покое и у кнопки закрытия фон прозрачный.
+        self._opaque_when_hovered = not is_danger and self._HOVER_BG_COLOR.alpha() == 255
 
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.drawPixmap(0, 0, self._symbol_pixmap())
+
+    def _symbol_pixmap(self) -> QPixmap:
+        """
+        Возвращает растровое изображение кнопки для текущего состояния.
+
+        Символ рисуется векторно один раз на (символ, наведение, danger, масштаб экрана)
+        и хранится в QPixmapCache; перерисовка кнопки сводится к копированию pixmap.
+        """
+        dpr = self.devicePixelRatioF()
+        key = f"tbb:{self.symbol}:{self.is_hovered}:{self.is_danger}:{dpr}"
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None:
+            pixmap = QPixmap(round(self.width() * dpr), round(self.height() * dpr))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(pixmap)
+            self._draw_symbol(painter)
+            painter.end()
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
 
+    def _draw_symbol(self, painter: QPainter):
+        # Сглаживание нужно только диагоналям крестика; прямоугольник и черта рисуются четко
         if self.is_hovered:
-            bg_color = self._DANGER_HOVER_BG_COLOR if self.is_danger else self._HOVER_BG_COLOR
-            symbol_color = self._HOVER_SYMBOL_COLOR
-            painter.setBrush(bg_color)
+            painter.setBrush(self._DANGER_HOVER_BG_COLOR if self.is_danger else self._HOVER_BG_COLOR)
             painter.setPen(Qt.PenStyle.NoPen)
             painter.drawRect(self.rect())
-        else:
-            symbol_color = self._SYMBOL_COLOR
-        
-        pen = QPen(symbol_color)
-        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+
+        pen = self._SYMBOL_PENS.get((self.is_hovered, self.symbol))
+        if pen is None: return
         painter.setPen(pen)
 
         symbol_rect = self.rect().adjusted(18, 11, -18, -11) # Центрируем область 10x10
 
         if self.symbol == "□":
-            pen.setWidthF(1.2)
-            painter.setPen(pen)
             painter.drawRect(symbol_rect)
         elif self.symbol == "—":
-            pen.setWidthF(1.5)
-            painter.setPen(pen)
             center_y = symbol_rect.center().y()
             painter.drawLine(QPointF(symbol_rect.left(), center_y), QPointF(symbol_rect.right(), center_y))
         elif self.symbol == "✕":
-            pen.setWidthF(1.5)
-            painter.setPen(pen)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
             cross_rect = symbol_rect.adjusted(1, 1, -1, -1)
             painter.drawLine(cross_rect.topLeft(), cross_rect.bottomRight())
             painter.drawLine(cross_rect.topRight(), cross_rect.bottomLeft())
 
-    def enterEvent(self, event): self.is_hovered = True; self.update()
-    def leaveEvent(self, event): self.is_hovered = False; self.update()
+    def enterEvent(self, event): self._set_hovered(True)
+    def leaveEvent(self, event): self._set_hovered(False)
+    def _set_hovered(self, hovered: bool):
+        self.is_hovered = hovered
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent, hovered and self._opaque_when_hovered)
+        self.update()
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self.clicked.emit()
@@ -73,6 +110,12 @@ class TitleBar(QWidget):
         super().__init__(parent)
         self.setFixedHeight(32)
         self.drag_position = None
+        # Перемещение окна троттлится: между срабатываниями таймера хранится только последняя позиция
+        self._pending_drag_pos = None
+        self._drag_timer = QTimer(self)
+        self._drag_timer.setSingleShot(True)
+        self._drag_timer.setInterval(DRAG_MOVE_INTERVAL_MS)
+        self._drag_timer.timeout.connect(self._apply_drag_move)
         self._setup_ui()
 
     def _setup_ui(self):
@@ -82,7 +125,7 @@ class TitleBar(QWidget):
         layout.setSpacing(0)
         
         title_label = QLabel("EvoCode AI")
-        title_label.setStyleSheet("color: #b9bbbe; padding-left: 15px; font-weight: 500;")
+        title_label.setObjectName("TitleBarLabel")
         
         layout.addSpacing(5)
         layout.addWidget(title_label)
@@ -115,9 +158,17 @@ class TitleBar(QWidget):
 
     def mouseMoveEvent(self, event):
         if event.buttons() == Qt.MouseButton.LeftButton and self.drag_position is not None:
-            self.window().move((event.globalPosition() - self.drag_position).toPoint())
+            self._pending_drag_pos = event.globalPosition()
+            if not self._drag_timer.isActive(): self._apply_drag_move()
             event.accept()
+
+    def _apply_drag_move(self):
+        if self._pending_drag_pos is None or self.drag_position is None: return
+        self.window().move((self._pending_drag_pos - self.drag_position).toPoint())
+        self._pending_drag_pos = None
+        self._drag_timer.start()
             
     def mouseReleaseEvent(self, event):
+        self._apply_drag_move()
         self.drag_position = None
         event.accept()
\ No newline at end of file
@@ -6,66 +6,24 @@
 from typing import Optional
 
 from PyQt6.QtWidgets import QWidget, QHBoxLayout, QLabel, QPushButton, QDialog, QVBoxLayout, QFrame
-from PyQt6.QtCore import pyqtSignal, Qt, QSize, QPropertyAnimation, QEasingCurve, pyqtProperty, QPointF
-from PyQt6.QtGui import QColor, QMouseEvent
-import qtawesome as qta
+from PyQt6.QtCore import pyqtSignal, Qt, QSize, QPointF, QTimer
+from PyQt6.QtGui import QMouseEvent
 from .styles import PALETTE
+from .icons import cached_icon, cached_pixmap
+from .title_bar import DRAG_MOVE_INTERVAL_MS
 
 class AnimatedButton(QPushButton):
-    """Кнопка с плавной анимацией цвета фона при наведении."""
+    """
+    Кнопка с подсветкой фона при наведении.
+
+    Оформление и состояние наведения задаются правилами `AnimatedButton` в общей
+    таблице стилей приложения (styles.py), а не собственной таблицей виджета.
+    """
     def __init__(self, text="", icon=None, parent=None):
         super().__init__(text, parent)
         if icon:
             self.setIcon(icon)
-
-        # Сохраняем базовый стиль в отдельном атрибуте
-        self._base_style = f"""
-            QPushButton {{
-                background-color: transparent;
-                border: 1px solid {PALETTE['border_color']};
-                text-align: center;
-                padding: 10px;
-                border-radius: 5px;
-                font-weight: 500;
-            }}
-            QPushButton:hover {{
-                border-color: {PALETTE['text_muted']};
-            }}
-        """
-        self.setStyleSheet(self._base_style)
-        
-        # 1. СНАЧАЛА создаем атрибут, который будет анимироваться.
-        self._background_color = QColor("transparent")
-        
-        # 2. ТОЛЬКО ПОТОМ создаем анимацию, которая его использует.
-        self._animation = QPropertyAnimation(self, b"backgroundColor")
-        self._animation.setDuration(200)
-        self._animation.setEasingCurve(QEasingCurve.Type.InOutCubic)
-        
-        self.hover_color = QColor(PALETTE['glass_border'])
-
-    def enterEvent(self, event):
         self.setCursor(Qt.CursorShape.PointingHandCursor)
-        self._animation.setEndValue(self.hover_color)
-        self._animation.start()
-        super().enterEvent(event)
-
-    def leaveEvent(self, event):
-        self.setCursor(Qt.CursorShape.ArrowCursor)
-        self._animation.setEndValue(QColor("transparent"))
-        self._animation.start()
-        super().leaveEvent(event)
-    
-    @pyqtProperty(QColor)
-    def backgroundColor(self) -> QColor:
-        return self._background_color
-
-    @backgroundColor.setter
-    def backgroundColor(self, color: QColor):
-        self._background_color = color
-        # Формируем новую, валидную таблицу стилей, не накапливая стили
-        current_stylesheet = self._base_style + f" QPushButton {{ background-color: {color.name(QColor.NameFormat.HexArgb)}; }}"
-        self.setStyleSheet(current_stylesheet)
 
 
 class ValueSelector(QWidget):
@@ -79,7 +37,9 @@ class ValueSelector(QWidget):
         self.setObjectName("ValueSelector")
         self.min_val = min_val
         self.max_val = max_val
-        self._value = initial_val
+        self._value = min(max(initial_val, min_val), max_val)
+        # Подписи для всех допустимых значений готовятся один раз
+        self._labels = tuple(str(i) for i in range(min_val, max_val + 1))
         self._setup_ui()
         self._update_label()
 
@@ -87,14 +47,14 @@ class ValueSelector(QWidget):
         layout = QHBoxLayout(self)
         layout.setContentsMargins(1, 1, 1, 1)
         layout.setSpacing(0)
-        self.minus_button = QPushButton(qta.icon('fa5s.minus', color=PALETTE['text_muted']), "")
+        self.minus_button = QPushButton(cached_icon('fa5s.minus', PALETTE['text_muted']), "")
         self.minus_button.setObjectName("ValueSelectorButton")
         self.minus_button.setIconSize(QSize(10, 10))
         self.value_label = QLabel()
         self.value_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.value_label.setMinimumWidth(35)
         self.value_label.setObjectName("ValueSelectorLabel")
-        self.plus_button = QPushButton(qta.icon('fa5s.plus', color=PALETTE['text_muted']), "")
+        self.plus_button = QPushButton(cached_icon('fa5s.plus', PALETTE['text_muted']), "")
         self.plus_button.setObjectName("ValueSelectorButton")
         self.plus_button.setIconSize(QSize(10, 10))
         layout.addWidget(self.minus_button)
@@ -104,26 +64,32 @@ class ValueSelector(QWidget):
         self.plus_button.clicked.connect(self._increment)
     
     def _update_label(self):
-        self.value_label.setText(str(self._value))
+        self.value_label.setText(self._labels[self._value - self.min_val])
 
-    def _decrement(self):
-        if self._value > self.min_val:
-            self._value -= 1
-            self._update_label()
-            self.valueChanged.emit(self._value)
+    def _decrement(self): self._step(-1)
 
-    def _increment(self):
-        if self._value < self.max_val:
-            self._value += 1
-            self._update_label()
-            self.valueChanged.emit(self._value)
+    def _increment(self): self._step(1)
+
+    def _step(self, delta: int):
+        """Сдвигает значение на `delta` в пределах [min_val, max_val]; на границе ничего не делает."""
+        value = min(max(self._value + delta, self.min_val), self.max_val)
+        if value == self._value:
+            return
+        self._value = value
+        self._update_label()
+        self.valueChanged.emit(value)
 
     def value(self) -> int:
         return self._value
 
 
 class CustomMessageBox(QDialog):
-    """Кастомное, стилизованное диалоговое окно."""
+    """
+    Кастомное, стилизованное диалоговое окно.
+
+    Содержимое (макеты, иконка) строится при первом показе, а не в конструкторе,
+    поэтому созданный «про запас» и так и не показанный диалог почти ничего не стоит.
+    """
     def __init__(self, title: str, message: str, icon_name: str, icon_color: str, parent=None):
         super().__init__(parent)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Dialog)
@@ -132,7 +98,21 @@ class CustomMessageBox(QDialog):
         self.setObjectName("MessageBox")
         
         self.drag_position: Optional[QPointF] = None
-        self._setup_ui(title, message, icon_name, icon_color)
+        # Как и в TitleBar: окно двигается не чаще раза за кадр, к последней позиции курсора
+        self._pending_drag_pos: Optional[QPointF] = None
+        self._drag_timer = QTimer(self)
+        self._drag_timer.setSingleShot(True)
+        self._drag_timer.setInterval(DRAG_MOVE_INTERVAL_MS)
+        self._drag_timer.timeout.connect(self._apply_drag_move)
+        self._ui_args = (title, message, icon_name, icon_color)
+        self._built = False
+
+    def setVisible(self, visible: bool):
+        # Строим UI до показа: QDialog вычисляет размер и положение окна по содержимому
+        if visible and not self._built:
+            self._built = True
+            self._setup_ui(*self._ui_args)
+        super().setVisible(visible)
 
     def _setup_ui(self, title, message, icon_name, icon_color):
         layout = QVBoxLayout(self)
@@ -147,7 +127,7 @@ class CustomMessageBox(QDialog):
         title_bar_layout = QHBoxLayout()
         title_label = QLabel(title)
         title_label.setObjectName("MessageBoxTitle")
-        close_button = QPushButton(qta.icon('fa5s.times', color=PALETTE['text_muted']), "")
+        close_button = QPushButton(cached_icon('fa5s.times', PALETTE['text_muted']), "")
         close_button.setObjectName("MessageBoxCloseButton")
         close_button.setFixedSize(28, 28)
         close_button.clicked.connect(self.reject)
@@ -158,7 +138,7 @@ class CustomMessageBox(QDialog):
         content_layout = QHBoxLayout()
         content_layout.setSpacing(15)
         icon_label = QLabel()
-        icon_label.setPixmap(qta.icon(icon_name, color=icon_color).pixmap(QSize(48, 48)))
+        icon_label.setPixmap(cached_pixmap(icon_name, icon_color, 48))
         message_label = QLabel(message)
         message_label.setWordWrap(True)
         content_layout.addWidget(icon_label)
@@ -184,9 +164,17 @@ class CustomMessageBox(QDialog):
             
     def mouseMoveEvent(self, event: QMouseEvent):
         if event.buttons() == Qt.MouseButton.LeftButton and self.drag_position is not None:
-            self.move((event.globalPosition() - self.drag_position).toPoint())
+            self._pending_drag_pos = event.globalPosition()
+            if not self._drag_timer.isActive(): self._apply_drag_move()
             event.accept()
+
+    def _apply_drag_move(self):
+        if self._pending_drag_pos is None or self.drag_position is None: return
+        self.move((self._pending_drag_pos - self.drag_position).toPoint())
+        self._pending_drag_pos = None
+        self._drag_timer.start()
             
     def mouseReleaseEvent(self, event: QMouseEvent):
+        self._apply_drag_move()
         self.drag_position = None
         event.accept()
\ No newline at end of file
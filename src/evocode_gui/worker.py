@@ -4,14 +4,24 @@
 Содержит логику для выполнения длительных задач в отдельном потоке,
 чтобы не замораживать графический интерфейс.
 """
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Any, List, Union, Optional
 
 from PyQt6.QtCore import QObject, pyqtSignal
 
-from evocode_core import Orchestrator, ImprovementIdea, ImplementationPlan
+from evocode_core import ImprovementIdea, ImplementationPlan
 from evocode_core.exceptions import APIKeyNotFoundError, CoreError
 
+# Скрытые записи (.git, .venv, .idea, .vscode, .DS_Store и др.) отбрасываются проверкой
+# первого символа имени, поэтому здесь перечислены только видимые исключаемые имена
+_EXCLUDED_NAMES = frozenset({'__pycache__', 'venv', 'node_modules'})
+SCAN_MAX_WORKERS = 8 # Потоков для параллельного чтения директорий при сканировании
+SCAN_PARALLEL_MIN_DIRS = 64 # С какой ширины уровня обхода чтение директорий распараллеливается
+
 # --- Классы для описания задач ---
 
 class ScanTask:
@@ -21,7 +31,7 @@ class ScanTask:
 
 class EvoTask:
     """Задача для запуска основного цикла EvoCode."""
-    def __init__(self, project_path: Path, cycles: int, prompts: Dict[str, Any]):
+    def __init__(self, project_path: Path, cycles: int, prompts: Mapping[str, Any]):
         self.project_path = project_path
         self.cycles = cycles
         self.prompts = prompts
@@ -44,6 +54,9 @@ class Worker(QObject):
         super().__init__()
         self.task = task
         self._is_cancelled = False
+        # Прерывает ожидания между повторными попытками агента сразу после отмены
+        self._cancel_event = threading.Event()
+        self._last_file_activity: Optional[str] = None
 
     def run(self):
         """Выполняет задачу в зависимости от ее типа."""
@@ -64,32 +77,61 @@ class Worker(QObject):
         try:
             self.stage_changed.emit("Сканирование проекта...")
             structure = self._scan_directory_iterative(self.task.path)
-            self.scan_finished.emit(structure)
+            if not self._is_cancelled:
+                self.scan_finished.emit(structure)
         except Exception as e:
             self.error.emit("Ошибка сканирования", f"Не удалось просканировать директорию: {e}")
 
     def _scan_directory_iterative(self, root_path: Path) -> Dict[str, Any]:
-        """Итеративно сканирует директорию и возвращает вложенную структуру."""
+        """
+        Итеративно сканирует директорию и возвращает вложенную структуру.
+
+        Обход идет в ширину по уровням. Пока уровень неширокий, директории читаются
+        последовательно; начиная с SCAN_PARALLEL_MIN_DIRS директорий на уровне их
+        листинги запрашиваются параллельно в пуле потоков (os.scandir отпускает GIL
+        на время системных вызовов). Структура заполняется только в этом потоке.
+        """
         structure = {}
-        queue = [(root_path, structure)]
-        EXCLUDED_DIRS = {'.git', '__pycache__', '.venv', 'venv', 'node_modules', '.idea', '.vscode'}
-        EXCLUDED_FILES = {'.DS_Store'}
-        while queue:
-            current_path, parent_dict = queue.pop(0)
-            try:
-                entries = sorted(current_path.iterdir(), key=lambda p: (not p.is_dir(), p.name.lower()))
-                for p in entries:
-                    if p.name in EXCLUDED_DIRS or p.name in EXCLUDED_FILES or p.name.startswith('.'):
-                        continue
-                    if p.is_dir():
-                        parent_dict[p.name] = {}
-                        queue.append((p, parent_dict[p.name]))
-                    else:
-                        parent_dict[p.name] = "file"
-            except OSError:
-                continue
+        level = [(root_path, structure)]
+        pool: Optional[ThreadPoolExecutor] = None
+        try:
+            while level and not self._is_cancelled:
+                if pool is None and len(level) >= SCAN_PARALLEL_MIN_DIRS:
+                    pool = ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS)
+                paths = [path for path, _ in level]
+                listings = pool.map(self._list_directory, paths) if pool else map(self._list_directory, paths)
+                next_level = []
+                for (_, parent_dict), entries in zip(level, listings):
+                    for is_file, name, entry_path in entries:
+                        if is_file:
+                            parent_dict[name] = "file"
+                        else:
+                            parent_dict[name] = {}
+                            next_level.append((entry_path, parent_dict[name]))
+                level = next_level
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
         return structure
 
+    def _list_directory(self, path) -> List[tuple]:
+        """Возвращает отсортированные (is_file, name, path) для видимых записей директории."""
+        if self._is_cancelled:
+            return []
+        try:
+            # DirEntry хранит имя и тип из readdir, поэтому stat() нужен только для символических ссылок.
+            # Ссылки на директории, как и раньше, показываются раскрываемыми папками.
+            with os.scandir(path) as it:
+                entries = sorted(
+                    ((not e.is_dir(), e.name.lower(), e.name, e.path) for e in it)
+                )
+        except OSError:
+            return []
+        return [
+            (is_file, name, entry_path) for is_file, _, name, entry_path in entries
+            if not (name.startswith('.') or name in _EXCLUDED_NAMES)
+        ]
+
     def _run_evo_task(self):
         """Выполняет основную задачу EvoCode."""
         # ИСПРАВЛЕНИЕ: Получаем данные из объекта self.task, а не из self
@@ -97,13 +139,17 @@ class Worker(QObject):
             self.error.emit("Ошибка Worker", "Неверный тип задачи для выполнения цикла EvoCode.")
             return
 
+        # Ядро с клиентом Gemini загружается только при запуске цикла, не при сканировании
+        from evocode_core import Orchestrator
+
         try:
             hooks = {
                 'on_stage_change': self.stage_changed.emit,
                 'on_idea_approved': self.idea_approved.emit,
                 'on_plan_approved': self.plan_approved.emit,
                 'is_cancelled': lambda: self._is_cancelled,
-                'on_file_activity': self.file_activity_changed.emit
+                'wait_cancel': self._cancel_event.wait,
+                'on_file_activity': self._report_file_activity
             }
             
             orchestrator = Orchestrator(
@@ -118,6 +164,14 @@ class Worker(QObject):
         except ValueError as e:
             self.error.emit("Ошибка конфигурации", str(e))
 
+    def _report_file_activity(self, path: str):
+        """Пересылает в GUI смену активного файла; повторы того же пути (чтение, затем запись) отбрасываются."""
+        if path == self._last_file_activity:
+            return
+        self._last_file_activity = path
+        self.file_activity_changed.emit(path)
+
     def cancel(self):
-        """Устанавливает флаг отмены для Orchestrator."""
-        self._is_cancelled = True
\ No newline at end of file
+        """Устанавливает флаг отмены для Orchestrator и прерывает текущее ожидание повтора."""
+        self._is_cancelled = True
+        self._cancel_event.set()
\ No newline at end of file
@@ -0,0 +1,63 @@
+import pytest
+
+from src.evocode_core.tools import FileSystemTools
+
+
+@pytest.fixture
+def fs_tools(tmp_path):
+    return FileSystemTools(project_root=tmp_path)
+
+
+def test_patch_lf_file(fs_tools, tmp_path):
+    """Заменяет блок в файле с окончаниями строк LF."""
+    target = tmp_path / "module.py"
+    target.write_bytes(b"a = 1\nb = 2\nc = 3\n")
+
+    result = fs_tools.apply_patch("module.py", "b = 2\n", "b = 20\n")
+
+    assert "успешно" in result
+    assert target.read_bytes() == b"a = 1\nb = 20\nc = 3\n"
+
+
+def test_patch_crlf_file_keeps_crlf(fs_tools, tmp_path):
+    """Блок с '\\n' находится в CRLF-файле, и замена тоже записывается с CRLF."""
+    target = tmp_path / "module.py"
+    target.write_bytes(b"a = 1\r\nb = 2\r\nc = 3\r\n")
+
+    result = fs_tools.apply_patch("module.py", "a = 1\nb = 2\n", "a = 1\nb = 20\nd = 4\n")
+
+    assert "успешно" in result
+    assert target.read_bytes() == b"a = 1\r\nb = 20\r\nd = 4\r\nc = 3\r\n"
+
+
+def test_patch_missing_snippet_leaves_file_unchanged(fs_tools, tmp_path):
+    """Если блок не найден, возвращается ошибка, а файл не меняется."""
+    target = tmp_path / "module.py"
+    original = b"a = 1\r\nb = 2\r\n"
+    target.write_bytes(original)
+
+    result = fs_tools.apply_patch("module.py", "z = 9\n", "z = 10\n")
+
+    assert "не найден" in result
+    assert target.read_bytes() == original
+
+
+def test_patch_replaces_only_first_occurrence(fs_tools, tmp_path):
+    """Заменяется только первое вхождение блока."""
+    target = tmp_path / "module.py"
+    target.write_bytes(b"x = 0\nx = 0\n")
+
+    fs_tools.apply_patch("module.py", "x = 0\n", "x = 1\n")
+
+    assert target.read_bytes() == b"x = 1\nx = 0\n"
+
+
+def test_patch_preserves_non_utf8_bytes(fs_tools, tmp_path):
+    """Байты вне заменяемого блока, в том числе не UTF-8, остаются без изменений."""
+    target = tmp_path / "legacy.py"
+    target.write_bytes(b"# caf\xe9\nvalue = 1\n# \xff\xfe\n")
+
+    result = fs_tools.apply_patch("legacy.py", "value = 1", "value = 2")
+
+    assert "успешно" in result
+    assert target.read_bytes() == b"# caf\xe9\nvalue = 2\n# \xff\xfe\n"
@@ -5,3 +5,11 @@ from error_codes import ErrorCodes
 def test_file_not_found_error_code():
     assert ErrorCodes.FILE_NOT_FOUND.value == 7
     assert ErrorCodes.FILE_NOT_FOUND.name == "FILE_NOT_FOUND"
+
+
+def test_exit_with_error_uses_exception_exit_code():
+    from error_handler import EvoCodeError, ConfigurationError, exit_with_error
+
+    assert exit_with_error(ConfigurationError("bad config")) == ErrorCodes.CONFIGURATION_ERROR.value
+    assert exit_with_error(EvoCodeError("missing", ErrorCodes.FILE_NOT_FOUND)) == ErrorCodes.FILE_NOT_FOUND.value
+    assert exit_with_error(ValueError("other")) == ErrorCodes.GENERAL_ERROR.value
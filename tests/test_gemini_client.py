@@ -1,10 +1,11 @@
 import pytest
-import os
+import asyncio
 import time
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace as NS
+from unittest.mock import patch, MagicMock, AsyncMock
 
 # Импортируем тестируемые компоненты
-from src.evocode_core.client import GeminiClient, retry_on_api_error, MAX_API_RETRIES, INITIAL_RETRY_DELAY_SECONDS
+from src.evocode_core.client import GeminiClient, _configure_genai, retry_on_api_error, retry_on_api_error_async, MAX_API_RETRIES, INITIAL_RETRY_DELAY_SECONDS, MAX_RETRY_DELAY_SECONDS
 from src.evocode_core.exceptions import (
     APIKeyNotFoundError,
     ContentBlockedError,
@@ -18,89 +19,149 @@ from google.api_core import exceptions as google_exceptions
 
 # --- Фикстуры и моки ---
 
-@pytest.fixture(autouse=True)
-def mock_genai_configure():
-    """Автоматически мокает genai.configure, чтобы избежать реальных вызовов API."""
+@pytest.fixture(scope="module")
+def _genai_configure_patch():
+    """Мокает genai.configure один раз на модуль, чтобы избежать реальных вызовов API."""
     with patch("src.evocode_core.client.genai.configure") as mock_configure:
         yield mock_configure
-        # Сбрасываем флаг конфигурации после каждого теста для изоляции
-        GeminiClient._is_configured = False
 
 @pytest.fixture(autouse=True)
-def mock_time_sleep():
-    """Мокает time.sleep, чтобы тесты не ждали реально."""
+def mock_genai_configure(_genai_configure_patch):
+    """Выдает тесту общий мок genai.configure в исходном состоянии."""
+    _genai_configure_patch.reset_mock()
+    yield _genai_configure_patch
+    # Сбрасываем кэш конфигурации после каждого теста для изоляции
+    _configure_genai.cache_clear()
+
+@pytest.fixture(scope="module")
+def _time_sleep_patch():
+    """Мокает time.sleep один раз на модуль, чтобы тесты не ждали реально."""
     with patch("src.evocode_core.client.time.sleep") as mock_sleep:
         yield mock_sleep
 
+@pytest.fixture(autouse=True)
+def mock_time_sleep(_time_sleep_patch):
+    """Выдает тесту общий мок time.sleep без вызовов из предыдущих тестов."""
+    _time_sleep_patch.reset_mock()
+    yield _time_sleep_patch
+
+@pytest.fixture(scope="module", autouse=True)
+def _api_key():
+    """Задает тестовый API-ключ один раз на модуль и восстанавливает окружение после него."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("GEMINI_API_KEY", "test_key")
+        yield
+
+@pytest.fixture
+def mock_generative_model():
+    """Мокает genai.GenerativeModel; тест настраивает возвращаемую модель сам."""
+    with patch("src.evocode_core.client.genai.GenerativeModel") as mock_model:
+        yield mock_model
+
+@pytest.fixture
+def client(mock_generative_model):
+    """Клиент с замоканной моделью; кэш моделей у каждого теста свой."""
+    return GeminiClient()
+
+@pytest.fixture(params=[
+    (google_exceptions.ResourceExhausted, 429, GeminiRateLimitError, True),
+    (google_exceptions.ServiceUnavailable, 503, GeminiServiceUnavailableError, True),
+    (google_exceptions.InvalidArgument, 400, GeminiAPIError, False),
+], ids=["rate_limit", "service_unavailable", "non_retryable"])
+def retry_case(request):
+    """(класс ошибки Google API, код, ожидаемое исключение, выполняются ли повторы)."""
+    return request.param
+
+@retry_on_api_error
+def _failing_api_call(exc_cls, code):
+    """Всегда падает с ошибкой Google API; декоратор применяется один раз при загрузке модуля."""
+    # Создаем исключение, затем устанавливаем атрибут code
+    err = exc_cls("API error")
+    err.code = code
+    raise err
+
+def _rate_limit_error():
+    """Ошибка 429 от Google API; код задается атрибутом после создания исключения."""
+    err = google_exceptions.ResourceExhausted("Rate limit")
+    err.code = 429
+    return err
+
+class _FunctionCallResponse:
+    """Ответ с function_call: доступ к .text выбрасывает ValueError, как в SDK."""
+    parts = [object()]
+
+    @property
+    def text(self):
+        raise ValueError("No text")
+
 # --- Тесты для GeminiClient ---
 
 class TestGeminiClient:
 
-    @patch.dict(os.environ, {}, clear=True)
-    def test_init_no_api_key(self):
+    def test_init_no_api_key(self, monkeypatch):
         """Проверяет, что при отсутствии API-ключа выбрасывается APIKeyNotFoundError."""
+        monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+        monkeypatch.delenv("EVOCODE_API_KEY", raising=False)
         with pytest.raises(APIKeyNotFoundError):
             GeminiClient()
 
-    @patch.dict(os.environ, {"GEMINI_API_KEY": "test_key"}, clear=True)
     def test_init_with_api_key(self, mock_genai_configure):
         """Проверяет успешную инициализацию с ключом и однократную конфигурацию."""
         client = GeminiClient()
         mock_genai_configure.assert_called_once_with(api_key="test_key")
-        assert GeminiClient._is_configured is True
 
         # Проверяем, что configure не вызывается повторно
         mock_genai_configure.reset_mock()
         client2 = GeminiClient()
         mock_genai_configure.assert_not_called()
 
-    @patch.dict(os.environ, {"GEMINI_API_KEY": "test_key"}, clear=True)
-    @patch("src.evocode_core.client.genai.GenerativeModel")
-    def test_generate_text_success(self, mock_generative_model):
+    def test_generate_text_success(self, client, mock_generative_model):
         """Проверяет успешную генерацию текста."""
         mock_model_instance = MagicMock()
         mock_generative_model.return_value = mock_model_instance
-        mock_response = MagicMock()
-        mock_response.text = "Generated text"
-        mock_response.parts = [MagicMock()] # Убедимся, что parts не пустой
-        mock_response.prompt_feedback.block_reason = None
+        # Непустые parts: ответ не заблокирован
+        mock_response = NS(text="Generated text", parts=[object()], prompt_feedback=NS(block_reason=None))
         mock_model_instance.generate_content.return_value = mock_response
 
-        client = GeminiClient()
         result = client.generate_text("system", "user")
 
         assert result == "Generated text"
 
-    @patch.dict(os.environ, {"GEMINI_API_KEY": "test_key"}, clear=True)
-    @patch("src.evocode_core.client.genai.GenerativeModel")
-    def test_generate_text_content_blocked(self, mock_generative_model):
+    def test_generate_text_content_blocked(self, client, mock_generative_model):
         """Проверяет, что выбрасывается ContentBlockedError при блокировке ответа."""
         mock_model_instance = MagicMock()
         mock_generative_model.return_value = mock_model_instance
-        mock_response = MagicMock()
-        mock_response.parts = [] # Пустые parts сигнализируют о проблеме
-        mock_response.prompt_feedback.block_reason.name = "SAFETY"
+        # Пустые parts сигнализируют о проблеме
+        mock_response = NS(parts=[], prompt_feedback=NS(block_reason=NS(name="SAFETY")))
         mock_model_instance.generate_content.return_value = mock_response
 
-        client = GeminiClient()
         with pytest.raises(ContentBlockedError, match="Ответ был заблокирован: SAFETY"):
             client.generate_text("system", "user")
 
-    @patch.dict(os.environ, {"GEMINI_API_KEY": "test_key"}, clear=True)
-    @patch("src.evocode_core.client.genai.GenerativeModel")
-    def test_generate_text_returns_function_call(self, mock_generative_model):
-        """Проверяет, что при получении function_call возвращается заглушка."""
+    def test_generate_text_returns_function_call(self, client, mock_generative_model):
+        """Проверяет, что при получении function_call выбрасывается GeminiAPIError."""
         mock_model_instance = MagicMock()
         mock_generative_model.return_value = mock_model_instance
-        mock_response = MagicMock()
-        # Имитируем ошибку при доступе к .text, как это происходит при function_call
-        type(mock_response).text = PropertyMock(side_effect=ValueError("No text"))
-        mock_response.parts = [MagicMock()]
+        mock_response = _FunctionCallResponse()
         mock_model_instance.generate_content.return_value = mock_response
 
-        client = GeminiClient()
-        result = client.generate_text("system", "user")
-        assert result == "[AI-агент вернул нетекстовый ответ, который не удалось обработать]"
+        with pytest.raises(GeminiAPIError, match="нетекстовый ответ"):
+            client.generate_text("system", "user")
+
+    def test_generate_text_stream_stops_early(self, client, mock_generative_model):
+        """Проверяет, что потоковое чтение прекращается, как только stop_when вернул True."""
+        def make_chunk(text):
+            return NS(parts=[object()], text=text)
+
+        chunks = [make_chunk("```json\n[1]"), make_chunk("\n```"), make_chunk(" лишний текст")]
+        mock_model_instance = MagicMock()
+        mock_generative_model.return_value = mock_model_instance
+        mock_model_instance.generate_content.return_value = iter(chunks)
+
+        result = client.generate_text("system", "user", stop_when=lambda text, chunk: text.endswith("```"))
+
+        assert result == "```json\n[1]\n```"
+        mock_model_instance.generate_content.assert_called_once_with("user", stream=True)
 
 # --- Тесты для декоратора retry_on_api_error ---
 
@@ -117,59 +178,38 @@ class TestRetryOnApiErrorDecorator:
 
     def test_success_after_retry(self, mock_time_sleep):
         """Проверяет успех после одной повторной попытки."""
-        call_count = 0
-        @retry_on_api_error
-        def mock_func():
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                # ИСПРАВЛЕНИЕ: Создаем исключение, затем устанавливаем атрибут
-                err = google_exceptions.ResourceExhausted("Rate limit")
-                err.code = 429
-                raise err
-            return "Success"
-        
-        assert mock_func() == "Success"
-        assert call_count == 2
-        mock_time_sleep.assert_called_once_with(INITIAL_RETRY_DELAY_SECONDS)
+        api_call = MagicMock(side_effect=[_rate_limit_error(), "Success"])
+        mock_func = retry_on_api_error(api_call)
 
-    def test_raises_rate_limit_error_after_all_retries(self, mock_time_sleep):
-        """Проверяет, что после всех попыток выбрасывается GeminiRateLimitError."""
-        @retry_on_api_error
-        def mock_func():
-            # ИСПРАВЛЕНИЕ: Создаем исключение, затем устанавливаем атрибут
-            err = google_exceptions.ResourceExhausted("Rate limit")
-            err.code = 429
-            raise err
-
-        with pytest.raises(GeminiRateLimitError):
-            mock_func()
-        assert mock_time_sleep.call_count == MAX_API_RETRIES - 1
+        assert mock_func() == "Success"
+        assert api_call.call_count == 2
+        mock_time_sleep.assert_called_once()
+        # Полный джиттер: задержка случайна в пределах [0, INITIAL_RETRY_DELAY_SECONDS]
+        assert 0 <= mock_time_sleep.call_args.args[0] <= INITIAL_RETRY_DELAY_SECONDS
 
-    def test_raises_service_unavailable_error(self, mock_time_sleep):
-        """Проверяет, что выбрасывается GeminiServiceUnavailableError."""
+    def test_retry_delay_is_capped(self, mock_time_sleep):
+        """Проверяет, что задержка между попытками не превышает MAX_RETRY_DELAY_SECONDS."""
         @retry_on_api_error
         def mock_func():
-            # ИСПРАВЛЕНИЕ: Создаем исключение, затем устанавливаем атрибут
             err = google_exceptions.ServiceUnavailable("Unavailable")
             err.code = 503
             raise err
 
-        with pytest.raises(GeminiServiceUnavailableError):
-            mock_func()
+        with patch("src.evocode_core.client.random.uniform", side_effect=lambda low, high: high):
+            with pytest.raises(GeminiServiceUnavailableError):
+                mock_func()
+        delays = [call.args[0] for call in mock_time_sleep.call_args_list]
+        assert delays == [min(MAX_RETRY_DELAY_SECONDS, INITIAL_RETRY_DELAY_SECONDS * (2 ** attempt)) for attempt in range(MAX_API_RETRIES - 1)]
 
-    def test_raises_api_error_for_non_retryable(self, mock_time_sleep):
-        """Проверяет, что для не-повторяемых ошибок нет повторных попыток."""
-        @retry_on_api_error
-        def mock_func():
-            # ИСПРАВЛЕНИЕ: Создаем исключение, затем устанавливаем атрибут
-            err = google_exceptions.InvalidArgument("Bad request")
-            err.code = 400
-            raise err
+    def test_raises_mapped_error(self, mock_time_sleep, monkeypatch, retry_case):
+        """Проверяет тип итоговой ошибки и то, что повторы выполняются только для временных ошибок."""
+        exc_cls, code, expected, retried = retry_case
+        # Двух попыток достаточно, чтобы проверить исчерпание повторов
+        monkeypatch.setattr("src.evocode_core.client.MAX_API_RETRIES", 2)
 
-        with pytest.raises(GeminiAPIError):
-            mock_func()
-        mock_time_sleep.assert_not_called()
+        with pytest.raises(expected):
+            _failing_api_call(exc_cls, code)
+        assert mock_time_sleep.call_count == (1 if retried else 0)
 
     def test_raises_core_error_for_unexpected_exception(self, mock_time_sleep):
         """Проверяет, что любая другая ошибка оборачивается в CoreError."""
@@ -181,10 +221,30 @@ class TestRetryOnApiErrorDecorator:
             mock_func()
         mock_time_sleep.assert_not_called()
 
-# Добавляем PropertyMock, если его нет в стандартной unittest.mock (для старых версий Python)
-try:
-    from unittest.mock import PropertyMock
-except ImportError:
-    class PropertyMock(MagicMock):
-        def __get__(self, obj, obj_type=None):
-            return self() 
\ No newline at end of file
+# --- Тесты для декоратора retry_on_api_error_async ---
+
+class TestRetryOnApiErrorAsyncDecorator:
+
+    def test_success_after_retry(self):
+        """Проверяет успех после одной повторной попытки без блокирующего time.sleep."""
+        api_call = AsyncMock(side_effect=[_rate_limit_error(), "Success"])
+        mock_func = retry_on_api_error_async(api_call)
+
+        with patch("src.evocode_core.client.asyncio.sleep", new=AsyncMock()) as mock_async_sleep:
+            assert asyncio.run(mock_func()) == "Success"
+        assert api_call.await_count == 2
+        mock_async_sleep.assert_awaited_once()
+        assert 0 <= mock_async_sleep.await_args.args[0] <= INITIAL_RETRY_DELAY_SECONDS
+
+    def test_raises_api_error_for_non_retryable(self):
+        """Проверяет, что для не-повторяемых ошибок нет повторных попыток."""
+        @retry_on_api_error_async
+        async def mock_func():
+            err = google_exceptions.InvalidArgument("Bad request")
+            err.code = 400
+            raise err
+
+        with patch("src.evocode_core.client.asyncio.sleep", new=AsyncMock()) as mock_async_sleep:
+            with pytest.raises(GeminiAPIError):
+                asyncio.run(mock_func())
+        mock_async_sleep.assert_not_awaited()
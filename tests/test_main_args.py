@@ -0,0 +1,29 @@
+import pytest
+
+from main import _build_parser, _fast_parse_args
+
+
+@pytest.mark.parametrize("argv", [
+    [],
+    ["gui"],
+    ["cli", "--project-path", "p", "--cycles", "3"],
+    ["--log-file=x", "cli", "--project-path", "p"],
+], ids=["empty", "gui", "cli", "main_option_before_subcommand"])
+def test_fast_parse_matches_argparse(argv):
+    """Быстрый разбор дает то же, что и argparse, для типичных командных строк."""
+    fast_args = _fast_parse_args(argv)
+
+    assert fast_args is not None
+    assert vars(fast_args) == vars(_build_parser().parse_args(argv))
+
+
+@pytest.mark.parametrize("argv", [
+    ["cli"],
+    ["cli", "--project-path", "p", "--unknown"],
+    ["cli", "--log-file", "x"],
+], ids=["missing_required", "unknown_flag", "main_option_after_subcommand"])
+def test_fast_parse_defers_errors_to_argparse(argv):
+    """Для некорректных командных строк быстрый разбор уступает argparse, который завершает работу с ошибкой."""
+    assert _fast_parse_args(argv) is None
+    with pytest.raises(SystemExit):
+        _build_parser().parse_args(argv)
@@ -1,46 +1,58 @@
-import importlib
+import sys
+from functools import lru_cache
+from importlib.util import find_spec
 from pathlib import Path
+from typing import NamedTuple, Sequence
 
 
-CORE_DEPENDENCIES = [
-    {
-        "module_name": "yaml",
-        "friendly_name": "PyYAML",
-        "install_command": "pip install PyYAML"
-    }
-]
+class Dependency(NamedTuple):
+    """Описание внешней зависимости: имя модуля, название для пользователя и команда установки."""
+    module_name: str
+    friendly_name: str
+    install_command: str
 
-GUI_DEPENDENCIES = [
-    {
-        "module_name": "PyQt6",
-        "friendly_name": "PyQt6",
-        "install_command": "pip install PyQt6"
-    }
-]
 
+CORE_DEPENDENCIES = (
+    Dependency("yaml", "PyYAML", "pip install PyYAML"),
+)
 
-def check_dependencies(dependencies_list: list[dict]) -> list[dict]:
+GUI_DEPENDENCIES = (
+    Dependency("PyQt6", "PyQt6", "pip install PyQt6"),
+    Dependency("numpy", "NumPy", "pip install numpy"),
+)
+
+
+def check_dependencies(dependencies_list: Sequence[Dependency]) -> list[Dependency]:
     """
     Проверяет наличие указанных зависимостей.
 
     Args:
-        dependencies_list (list[dict]): Список словарей с информацией о зависимостях.
+        dependencies_list (Sequence[Dependency]): Описания проверяемых зависимостей.
 
     Возвращает:
-        list[dict]: Список словарей, где каждый словарь представляет отсутствующую
-                   зависимость и содержит ключи 'friendly_name' (строка) и
-                   'install_command' (строка). Если все зависимости присутствуют,
-                   возвращает пустой список.
+        list[Dependency]: Отсутствующие зависимости в исходном порядке.
+                   Если все зависимости присутствуют, возвращает пустой список.
+    """
+    return list(_missing_dependencies(tuple(dependencies_list)))
+
+
+@lru_cache(maxsize=None)
+def _missing_dependencies(dependencies: tuple[Dependency, ...]) -> tuple[Dependency, ...]:
     """
-    missing_dependencies = []
-    for dep_info in dependencies_list:
-        try:
-            importlib.import_module(dep_info["module_name"])
-        except ImportError:
-            missing_dependencies.append(
-                {
-                    "friendly_name": dep_info["friendly_name"],
-                    "install_command": dep_info["install_command"]
-                }
-            )
-    return missing_dependencies
+    Возвращает ненайденные зависимости; результат стабилен в пределах процесса.
+
+    Модули не импортируются: find_spec только ищет их в sys.path, так что код
+    тяжелых пакетов (PyQt6, numpy) при проверке не выполняется.
+    """
+    # Уже импортированные модули заведомо доступны, искать их не нужно
+    unresolved = [dependency for dependency in dependencies if sys.modules.get(dependency.module_name) is None]
+    return tuple(dependency for dependency in unresolved if not _module_available(dependency.module_name))
+
+
+def _module_available(module_name: str) -> bool:
+    """Проверяет, что модуль можно найти, не выполняя его код."""
+    try:
+        return find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        # Отсутствующий родительский пакет или поврежденная запись в sys.modules
+        return False